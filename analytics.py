@@ -0,0 +1,188 @@
+# Chase Vitale
+# SwipeBeats
+
+# Swipe analytics: every swipe is stored with its dwell time, and per-genre/artist/subgenre aggregates are
+# updated in the same transaction so reports never have to scan the swipe history
+# Usage: python analytics.py [--by genre|artist|subgenre] [--limit 20] [--min-swipes 5]
+
+# Import statements
+import os
+import json
+import time
+import sqlite3
+import argparse
+from bisect import bisect_left
+
+#######################################################################################
+
+# Initializations
+
+ANALYTICS_DB_PATH = os.getenv("SWIPEBEATS_ANALYTICS_DB", "swipe_analytics.db")
+
+# Upper edges of the dwell time histogram buckets in ms (the last bucket catches everything longer)
+DWELL_BUCKETS_MS = [
+    250, 500, 1000, 2000, 3000, 5000, 7500, 10000, 15000, 20000,
+    30000, 45000, 60000, 90000, 120000, 180000, 300000,
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS swipes (
+    id INTEGER PRIMARY KEY,
+    swiped_at REAL NOT NULL,
+    track_id TEXT,
+    track_name TEXT,
+    liked INTEGER NOT NULL,
+    dwell_ms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    swipes INTEGER NOT NULL DEFAULT 0,
+    likes INTEGER NOT NULL DEFAULT 0,
+    dwell_total_ms INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS dwell_histogram (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key, bucket)
+);
+CREATE TABLE IF NOT EXISTS labels (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    label TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS aggregates_by_swipes ON aggregates (kind, swipes);
+"""
+
+#######################################################################################
+
+# Main functions
+
+# Opens (and creates if needed) the analytics database
+# Input: path to the database file
+# Output: sqlite3 connection
+def open_store(path=ANALYTICS_DB_PATH):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+# Stores one swipe and folds it into every aggregate it belongs to
+# Input: connection, track, liked (boolean), dwell time in ms, main genres, subgenres
+# Output: none
+def record_swipe(conn, track, liked, dwell_ms, genres, subgenres=()):
+    t = track["track"]
+    dwell_ms = max(0, int(dwell_ms))
+    bucket = bisect_left(DWELL_BUCKETS_MS, dwell_ms)
+    keys = [("all", "all")]
+    keys += [("genre", genre) for genre in dict.fromkeys(genres)]
+    # Artists are keyed by id so two artists sharing a name stay apart; their names go in labels
+    artists = {artist.get("id") or artist["name"]: artist["name"] for artist in t["artists"]}
+    keys += [("artist", artist_key) for artist_key in artists]
+    keys += [("subgenre", subgenre) for subgenre in dict.fromkeys(subgenres)]
+
+    with conn:
+        conn.execute(
+            "INSERT INTO swipes (swiped_at, track_id, track_name, liked, dwell_ms) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), t.get("id"), t.get("name"), int(liked), dwell_ms),
+        )
+        conn.executemany(
+            """INSERT INTO aggregates (kind, key, swipes, likes, dwell_total_ms) VALUES (?, ?, 1, ?, ?)
+               ON CONFLICT (kind, key) DO UPDATE SET
+                   swipes = swipes + 1, likes = likes + excluded.likes,
+                   dwell_total_ms = dwell_total_ms + excluded.dwell_total_ms""",
+            [(kind, key, int(liked), dwell_ms) for kind, key in keys],
+        )
+        conn.executemany(
+            """INSERT INTO dwell_histogram (kind, key, bucket, count) VALUES (?, ?, ?, 1)
+               ON CONFLICT (kind, key, bucket) DO UPDATE SET count = count + 1""",
+            [(kind, key, bucket) for kind, key in keys],
+        )
+        conn.executemany(
+            """INSERT INTO labels (kind, key, label) VALUES ('artist', ?, ?)
+               ON CONFLICT (kind, key) DO UPDATE SET label = excluded.label""",
+            list(artists.items()),
+        )
+
+# Estimates a percentile from a dwell histogram (reported as the bucket's upper edge)
+# Input: dictionary of bucket to count, percentile (0 to 100)
+# Output: dwell time in ms (None for an empty histogram)
+def histogram_percentile(histogram, percentile):
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = total * percentile / 100
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= target:
+            return DWELL_BUCKETS_MS[bucket] if bucket < len(DWELL_BUCKETS_MS) else float("inf")
+    return None
+
+# Reads the aggregates for one kind, most swiped first
+# Input: connection, kind ("genre", "artist", "subgenre" or "all"), row limit, minimum swipes
+# Output: list of dictionaries with key, display label, swipes, likes, like rate, mean and p50/p90 dwell
+def get_report(conn, kind="genre", limit=20, min_swipes=1):
+    rows = conn.execute(
+        """SELECT a.key, COALESCE(l.label, a.key), a.swipes, a.likes, a.dwell_total_ms FROM aggregates a
+           LEFT JOIN labels l ON l.kind = a.kind AND l.key = a.key
+           WHERE a.kind = ? AND a.swipes >= ? ORDER BY a.swipes DESC LIMIT ?""",
+        (kind, min_swipes, limit),
+    ).fetchall()
+    report = []
+    for key, label, swipes, likes, dwell_total_ms in rows:
+        histogram = dict(conn.execute(
+            "SELECT bucket, count FROM dwell_histogram WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchall())
+        report.append({
+            "key": key,
+            "label": label,
+            "swipes": swipes,
+            "likes": likes,
+            "like_rate": likes / swipes,
+            "mean_dwell_ms": dwell_total_ms / swipes,
+            "p50_dwell_ms": histogram_percentile(histogram, 50),
+            "p90_dwell_ms": histogram_percentile(histogram, 90),
+        })
+    return report
+
+# Prints a report table
+# Input: list of report rows, kind, optional function mapping a key to a note (e.g. subgenre -> main genre)
+# Output: none (prints to console)
+def print_report(report, kind, note=None):
+    print(f"{kind:<32}{'swipes':>8}{'likes':>8}{'like %':>8}{'p50 s':>8}{'p90 s':>8}")
+    print("-" * 72)
+    for row in report:
+        label = row["label"] if note is None else f"{row['label']} ({note(row['key'])})"
+        print(
+            f"{label[:31]:<32}{row['swipes']:>8}{row['likes']:>8}{100 * row['like_rate']:>8.1f}"
+            f"{row['p50_dwell_ms'] / 1000:>8.1f}{row['p90_dwell_ms'] / 1000:>8.1f}"
+        )
+
+#######################################################################################
+
+# Entry point
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show SwipeBeats like rates and dwell times")
+    parser.add_argument("--by", choices=["genre", "artist", "subgenre", "all"], default="genre")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--min-swipes", type=int, default=1)
+    parser.add_argument("--db", default=ANALYTICS_DB_PATH)
+    args = parser.parse_args()
+
+    # Shows which main genre genres.json maps each subgenre to
+    note = None
+    if args.by == "subgenre":
+        with open("genres.json", "r") as f:
+            categories = json.load(f)
+        mapping = {sub: parent for parent, subs in categories.items() for sub in subs}
+        note = lambda subgenre: mapping.get(subgenre, "unknown")
+
+    conn = open_store(args.db)
+    print_report(get_report(conn, args.by, args.limit, args.min_swipes), args.by, note)
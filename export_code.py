@@ -0,0 +1,218 @@
+# Chase Vitale
+# SwipeBeats
+
+# Bulk export: creates or updates one playlist per genre bucket (or per custom genre query)
+# Usage: python export_code.py [--genres pop rock] [--query "Chill=indie,folk"] [--prefix "SwipeBeats - "]
+# Interrupted runs pick up where they left off from the progress file
+
+# Import statements
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import main_code as mc  # Spotify backend logic
+import library_snapshot
+
+#######################################################################################
+
+# Initializations
+
+DEFAULT_PREFIX = "SwipeBeats - "
+DEFAULT_PROGRESS_PATH = "export_progress.json"
+DEFAULT_WORKERS = 4  # Playlists exported at the same time
+DEFAULT_RATE = 5.0  # Spotify requests per second across all workers
+
+#######################################################################################
+
+# Helper classes
+
+# Spaces requests out so all workers together stay under a fixed rate
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+#######################################################################################
+
+# Main functions
+
+# Loads the export progress file
+# Input: path to the progress file
+# Output: dictionary of playlist name to progress entry
+def load_progress(progress_path):
+    try:
+        with open(progress_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Saves the export progress file atomically
+# Input: path to the progress file, dictionary of playlist name to progress entry
+# Output: none
+def save_progress(progress_path, progress):
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+# Loads the genre buckets, from the saved snapshot when there is one
+# Input: whether to ignore the snapshot and fetch from Spotify
+# Output: dictionary of genre buckets
+def load_genre_buckets(refresh=False):
+    snapshot = None if refresh else library_snapshot.load_snapshot(mc.LIBRARY_SNAPSHOT_PATH)
+    if snapshot:
+        return snapshot.genre_buckets()
+    tracks, genres_by_artist, songs_genres = mc.load_liked_songs_progressively(mc.sp)
+    library_snapshot.save_snapshot(mc.LIBRARY_SNAPSHOT_PATH, tracks, genres_by_artist, songs_genres)
+    return songs_genres
+
+# Turns the command line choices into (playlist name, track uris) jobs
+# Input: genre buckets, list of genres (None for all), list of "Name=genre1,genre2" queries, name prefix
+# Output: list of (playlist name, list of track uris), leaving out jobs with no tracks
+def build_export_jobs(songs_genres, genres, queries, prefix):
+    jobs = []
+    if genres is None and not queries:
+        genres = [genre for genre, tracks in songs_genres.items() if len(tracks)]
+    for genre in genres or []:
+        jobs.append((f"{prefix}{genre}", [track["track"]["uri"] for track in songs_genres.get(genre, [])]))
+    for query in queries or []:
+        name, _, query_genres = query.partition("=")
+        query_genres = [g.strip() for g in query_genres.split(",") if g.strip()]
+        tracks, _ = mc.combine_genre_tracks(query_genres, songs_genres, shuffle=False)
+        jobs.append((f"{prefix}{name.strip()}", [track["track"]["uri"] for track in tracks]))
+    export_jobs = []
+    for name, uris in jobs:
+        uris = list(dict.fromkeys(uri for uri in uris if uri))
+        if uris:
+            export_jobs.append((name, uris))
+        else:
+            # Usually a misspelled genre; an empty playlist would be of no use
+            print(f"Skipping '{name}': no tracks found")
+    return export_jobs
+
+# Lists the playlists the user owns by name (followed playlists can't be added to)
+# Input: sp, rate limiter
+# Output: dictionary of playlist name to playlist
+def get_user_playlists_by_name(sp, limiter):
+    limiter.wait()
+    user_id = sp.current_user()["id"]
+    playlists = {}
+    offset = 0
+    while True:
+        limiter.wait()
+        response = sp.current_user_playlists(limit=50, offset=offset)
+        for playlist in response["items"]:
+            if playlist and playlist["owner"]["id"] == user_id:
+                playlists.setdefault(playlist["name"], playlist)
+        if not response["next"]:
+            return playlists
+        offset += len(response["items"])
+
+# Creates or updates one playlist, saving progress after every batch so it can resume
+# Input: sp, job name, track uris, existing playlists by name, progress dictionary and lock, progress path,
+#        playlist cache, rate limiter
+# Output: number of tracks added
+def export_playlist(sp, name, track_uris, existing, progress, progress_lock, progress_path, cache, limiter):
+    with progress_lock:
+        entry = progress.get(name)
+    if entry and entry.get("complete"):
+        return 0
+
+    # First run for this playlist: decide what to push and remember it
+    if entry is None:
+        playlist = existing.get(name)
+        if playlist:
+            # The listing already carries the snapshot id; every page of the playlist read is rate limited
+            present = mc.get_playlist_track_uris(sp, playlist["id"], playlist["snapshot_id"], cache, limiter.wait)
+            to_push = [uri for uri in track_uris if uri not in present]
+            playlist_id = playlist["id"]
+        else:
+            limiter.wait()
+            playlist_id = mc.create_playlist(sp, name, "Genre playlist exported by SwipeBeats")
+            to_push = track_uris
+        entry = {"playlist_id": playlist_id, "uris": to_push, "done_batches": 0, "complete": False}
+        with progress_lock:
+            progress[name] = entry
+            save_progress(progress_path, progress)
+
+    # Batches within a playlist go in order so the playlist keeps the bucket's order
+    uris = entry["uris"]
+    added = 0
+    for batch_index in range(entry["done_batches"], (len(uris) + 99) // 100):
+        batch = uris[batch_index * 100:(batch_index + 1) * 100]
+        limiter.wait()
+        sp.playlist_add_items(entry["playlist_id"], batch)
+        added += len(batch)
+        with progress_lock:
+            entry["done_batches"] = batch_index + 1
+            save_progress(progress_path, progress)
+
+    with progress_lock:
+        entry["complete"] = True
+        save_progress(progress_path, progress)
+    return added
+
+# Runs every export job concurrently within the rate limit
+# Input: sp, list of (playlist name, track uris), progress path, number of workers, requests per second
+# Output: dictionary of playlist name to tracks added
+def run_export(sp, jobs, progress_path=DEFAULT_PROGRESS_PATH, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE):
+    limiter = RateLimiter(rate)
+    progress = load_progress(progress_path)
+    progress_lock = threading.Lock()
+    cache = mc.load_playlist_cache()
+    existing = get_user_playlists_by_name(sp, limiter)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                export_playlist, sp, name, uris, existing, progress, progress_lock, progress_path, cache, limiter
+            ): name
+            for name, uris in jobs
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+                print(f"Exported '{name}': {results[name]} tracks added")
+            except Exception as e:
+                print(f"Error exporting '{name}' (rerun to resume): {e}")
+
+    mc.save_playlist_cache(cache)
+
+    # A fully finished run starts fresh next time
+    finished = all(entry.get("complete") for entry in progress.values()) and len(results) == len(jobs)
+    if finished and os.path.exists(progress_path):
+        os.remove(progress_path)
+    return results
+
+#######################################################################################
+
+# Entry point
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export one Spotify playlist per SwipeBeats genre")
+    parser.add_argument("--genres", nargs="*", help="Genre buckets to export (default: every non-empty bucket)")
+    parser.add_argument("--query", action="append", help='Custom playlist as "Name=genre1,genre2" (repeatable)')
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="Prefix for playlist names")
+    parser.add_argument("--progress", default=DEFAULT_PROGRESS_PATH, help="Progress file used to resume")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max Spotify requests per second")
+    parser.add_argument("--refresh", action="store_true", help="Fetch the library instead of using the snapshot")
+    parser.add_argument("--profile", action="store_true", help="Write per-stage profiles on exit")
+    args = parser.parse_args()
+
+    songs_genres = load_genre_buckets(args.refresh)
+    jobs = build_export_jobs(songs_genres, args.genres, args.query, args.prefix)
+    run_export(mc.sp, jobs, args.progress, args.workers, args.rate)
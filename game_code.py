@@ -8,11 +8,18 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, font as tkfont
 from PIL import Image, ImageTk
-import requests
 from io import BytesIO
 import threading
-import random
+import time
+import math
+import vlc
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import main_code as mc  # Your Spotify + VLC backend logic
+import library_snapshot
+import http_pool
+import analytics
+from profiling import profiled
 
 #######################################################################################
 
@@ -23,6 +30,7 @@ current_track_index = 0
 tracks_to_swipe = []
 right_swipes = []
 song_genres_global = {}
+artist_genres_global = {}
 album_photo = None
 loading = False
 DEFAULT_BG_COLOR = "#f0f0f0"  # Default light gray
@@ -31,35 +39,83 @@ current_bg_color = DEFAULT_BG_COLOR
 current_button_color = DEFAULT_BUTTON_COLOR
 previous_bg_color = DEFAULT_BG_COLOR
 fade_animation = None
+FADE_DURATION_MS = 500
+FADE_STEPS = 20
 total_songs = 0
 
-preloaded_stream_urls = {}
+preloaded_stream_urls = {}  # track index -> stream entry (see resolve_stream)
+recording_streams = OrderedDict()  # recording key -> stream entry, shared by every copy of a song
+RECORDING_STREAMS_MAX = 512
+preloading_indices = set()
 preload_lock = threading.Lock()
-PRELOAD_COUNT = 5  # How many upcoming tracks to preload
+player_lock = threading.RLock()
+player_generation = None  # Generation token of the card the current player belongs to
+
+# libvlc stop/release block, so swipes hand them to this single audio thread instead of stalling Tk
+audio_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio")
+
+# Preload depth adapts to how fast the user swipes and how long a resolve takes
+PRELOAD_MIN = 2  # Never preload fewer than this many upcoming tracks
+PRELOAD_MAX = 12  # Never preload more than this many upcoming tracks
+PRELOAD_HORIZON_SECONDS = 45  # Preloaded tracks should cover about this much future swiping
+STREAM_URL_MAX_AGE = 4 * 60 * 60  # Preloaded YouTube URLs older than this are treated as expired
+ESTIMATE_WEIGHT = 0.3  # Weight of the newest sample in the moving averages
+swipe_interval_estimate = 20.0  # Seconds between swipes
+resolve_latency_estimate = 3.0  # Seconds per stream resolve
+last_swipe_time = None
+preload_depth = PRELOAD_MIN
+preload_stats = {
+    "hits": 0, "misses": 0, "expired": 0, "unused": 0, "probe_failures": 0, "fallbacks": 0,
+    "previews": 0, "full_after_preview": 0,
+}
+
+# Preview mode plays Spotify's clip at once; the full song is only resolved for users still listening
+playback_mode = mc.PLAYBACK_MODE
+PREVIEW_RESOLVE_AFTER_SECONDS = 15  # Listening this long into a preview starts resolving the full song
+
+# Preloaded streams are health checked in parallel while the preloader moves on to the next track
+stream_probe_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="stream-probe")
+
+# Decoded album covers and their Tk photos, least recently used first
+image_cache = OrderedDict()  # album key -> (PIL image, PhotoImage, background color, size in bytes)
+image_cache_lock = threading.Lock()
+image_cache_bytes = 0
+image_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+displayed_image_key = None
+recording_art_keys = {}  # recording key -> album cache key of the cover its copies share
+IMAGE_CACHE_MAX_BYTES = 48 * 1024 * 1024  # Roughly 80 covers at 300x300 (about 630 KB each, see image_size_bytes)
+
+# Covers are decoded on a small dedicated pool; Pillow releases the GIL while decoding and resizing,
+# and capping it at two workers keeps prefetched covers from crowding out the Tk loop
+image_decode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cover-decode")
+
+# Swipe analytics are written on their own thread so SQLite never blocks a swipe
+analytics_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics")
+analytics_store = None
+deck_track_genres = {}  # track id -> selected genres the track came from
+card_shown_time = None
+
+# The next few cards are built ahead of time (text, cover in the image cache, colors and fade) so showing
+# one is a single apply step; their streams come from the preloader above
+prepared_cards = {}  # track index -> prepared card dictionary (see prepare_card)
+preparing_indices = set()
+card_lock = threading.Lock()
+CARD_QUEUE_SIZE = 3  # Cards kept ready ahead of the one on screen
+target_bg_color = DEFAULT_BG_COLOR  # Background the card on screen fades to
+swipe_started_at = None
+render_stats = {
+    "prepared": {"cards": 0, "total_ms": 0.0, "max_ms": 0.0},
+    "unprepared": {"cards": 0, "total_ms": 0.0, "max_ms": 0.0},
+}
+
+# Bumped on every swipe so background work for old cards can drop out early
+swipe_generation = 0
+AUDIO_SETTLE_MS = 150  # Delay before resolving audio so rapid swipes skip cards that are already gone
 
 #######################################################################################
 
 # Helper functions:
 
-# Gets the appropriate background color for the song cover image
-# Input: the string of the image URL
-# Output: the string of the hex color of the background image
-def get_dominant_color(image):
-    try:
-        img = image.copy()
-        img.thumbnail((50, 50))
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        pixels = list(img.getdata())
-        avg_color = tuple(
-            int(sum(channel) / len(pixels))
-            for channel in zip(*pixels)
-        )
-        return '#%02x%02x%02x' % avg_color
-    except Exception as e:
-        print(f"Error getting dominant color: {e}")
-        return "#f0f0f0"
-
 # Decides if the text color should be black or white based on the background color
 # Input: hex string of the background color
 # Output: string of the text color ("black" or "white")
@@ -73,17 +129,121 @@ def get_readable_text_color(bg_hex):
     except:
         return "black"
 
+# Checks if work started for a card has been overtaken by a newer swipe
+# Input: generation token captured when the work started
+# Output: True if the card is no longer on screen
+def is_stale(generation):
+    return generation is not None and generation != swipe_generation
+
+# Decodes and resizes a cover and measures its average color in the same pass
+# Input: bytes of the image, size tuple
+# Output: resized PIL Image object and hex color string
+@profiled("decode_cover")
+def decode_cover(data, size=(300, 300)):
+    img = Image.open(BytesIO(data))
+    # JPEG draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+    img.draft("RGB", size)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img = img.resize(size, Image.LANCZOS, reducing_gap=2.0)
+    # Box-averaging down to one pixel gives the cover's average color without a per-pixel Python loop
+    avg_color = img.resize((1, 1), Image.BOX).getpixel((0, 0))
+    return img, '#%02x%02x%02x' % avg_color
+
 # Loads the appropriate image from the URL and resizes it
-# Input: string of the image URL, size tuple (default 300x300)
-# Output: PIL Image object and Tkinter PhotoImage object
-def load_image_from_url(url, size=(300, 300)):
+# Input: string of the image URL, size tuple (default 300x300), optional generation token
+# Output: PIL Image object, Tkinter PhotoImage object and background color
+@profiled("load_image_from_url")
+def load_image_from_url(url, size=(300, 300), generation=None):
     try:
-        response = requests.get(url, timeout=10)
-        img = Image.open(BytesIO(response.content)).resize(size, Image.LANCZOS)
-        return img, ImageTk.PhotoImage(img)
+        response = http_pool.get(url, timeout=http_pool.ART_TIMEOUT)
+        if is_stale(generation):
+            return None, None, None
+        img, bg_color = image_decode_pool.submit(decode_cover, response.content, size).result()
+        if is_stale(generation):
+            return None, None, None
+        return img, ImageTk.PhotoImage(img), bg_color
     except Exception as e:
         print(f"Error loading image: {e}")
-        return None, None
+        return None, None, None
+
+# Gets the key used to cache a track's album cover
+# Copies of one recording (single, album, deluxe) all use the cover of the first copy seen, so they share
+# one cache entry and background color
+# Input: track dictionary
+# Output: album id (or image URL when there is no id), None when there is no cover
+def album_cache_key(track_dict):
+    album = track_dict["track"]["album"]
+    images = album.get("images", [])
+    if not images:
+        return None
+    key = album.get("id") or images[0]["url"]
+    with image_cache_lock:
+        return recording_art_keys.setdefault(mc.recording_key(track_dict), key)
+
+# Estimates the memory held by a cached cover (PIL pixels plus Tk's 4-byte-per-pixel copy)
+# Input: PIL Image object
+# Output: size in bytes
+def image_size_bytes(img):
+    width, height = img.size
+    return width * height * (len(img.getbands()) + 4)
+
+# Looks up a cover in the image cache and marks it as recently used
+# Input: album cache key
+# Output: (PIL image, PhotoImage, background color) or None on a miss
+def get_cached_image(key):
+    with image_cache_lock:
+        entry = image_cache.get(key)
+        if entry is None:
+            image_cache_stats["misses"] += 1
+            return None
+        image_cache.move_to_end(key)
+        image_cache_stats["hits"] += 1
+        return entry[:3]
+
+# Adds a cover to the image cache and evicts the least recently used ones over the byte budget
+# Input: album cache key, PIL image, PhotoImage, background color
+# Output: None
+def put_cached_image(key, pil_img, tk_img, bg_color):
+    global image_cache_bytes
+    evicted = []
+    with image_cache_lock:
+        if key in image_cache:
+            image_cache_bytes -= image_cache.pop(key)[3]
+        size = image_size_bytes(pil_img)
+        image_cache[key] = (pil_img, tk_img, bg_color, size)
+        image_cache_bytes += size
+        for old_key in list(image_cache):
+            if image_cache_bytes <= IMAGE_CACHE_MAX_BYTES:
+                break
+            # Never pull the cover that is on screen right now
+            if old_key in (key, displayed_image_key):
+                continue
+            _, old_tk_img, _, old_size = image_cache.pop(old_key)
+            image_cache_bytes -= old_size
+            image_cache_stats["evictions"] += 1
+            evicted.append((old_key, old_tk_img))
+    for old_key, old_tk_img in evicted:
+        root.after(0, lambda k=old_key, img=old_tk_img: release_photo_image(k, img))
+
+# Frees the native Tk image behind a PhotoImage instead of waiting for garbage collection
+# Input: album cache key, PhotoImage object
+# Output: None
+def release_photo_image(key, tk_img):
+    # The cover may have been put on screen after it was evicted
+    if key == displayed_image_key:
+        return
+    try:
+        root.tk.call("image", "delete", str(tk_img))
+    except tk.TclError:
+        pass
+
+# Reports how well the image cache is doing
+# Input: none
+# Output: dictionary of hits, misses, evictions, entries and bytes
+def get_image_cache_stats():
+    with image_cache_lock:
+        return dict(image_cache_stats, entries=len(image_cache), bytes=image_cache_bytes)
 
 # Darkens a hex color by a given factor to calculate button color
 # Input: hex color string, factor (default 0.5)
@@ -134,135 +294,102 @@ def interpolate_color(color1, color2, factor):
     
     return f"#{r:02x}{g:02x}{b:02x}"
 
+# Precomputes every step of a background fade, so a prepared card doesn't have to at swipe time
+# Input: start and end hex colors, number of steps
+# Output: list of (background, text, button) color tuples, start to end
+def build_fade_sequence(start_color, end_color, steps=FADE_STEPS):
+    sequence = []
+    for step in range(steps + 1):
+        color = interpolate_color(start_color, end_color, step / steps)
+        sequence.append((color, get_readable_text_color(color), darken_hex_color(color)))
+    return sequence
+
+# Applies one set of theme colors to every widget
+# Input: background, text and button hex colors
+# Output: None
+def apply_theme_colors(bg_color, text_color, button_color):
+    global current_bg_color, current_button_color
+    current_bg_color = bg_color
+    current_button_color = button_color
+
+    root.configure(bg=bg_color)
+    for frame in (
+        genre_frame, list_frame, button_frame,
+        swipe_frame, header_frame, swipe_button_frame,
+        album_art_frame
+    ):
+        frame.configure(bg=bg_color)
+
+    for widget in (name_label, artist_label, progress_label, status_label, album_art_label):
+        widget.configure(bg=bg_color, fg=text_color)
+    for checkbox in (append_checkbox, preview_checkbox):
+        checkbox.configure(bg=bg_color, fg=text_color, activebackground=bg_color, activeforeground=text_color, selectcolor=bg_color)
+
+    genre_listbox.configure(
+        bg=bg_color,
+        fg=text_color,
+        selectbackground=button_color,
+        selectforeground="white"
+    )
+
+    style.configure(
+        "Green.TButton",
+        background=button_color,
+        foreground="white"
+    )
+    style.map(
+        "Green.TButton",
+        background=[
+            ("pressed", button_color),
+            ("active", button_color),
+            ("disabled", button_color),
+            ("!active", button_color),
+        ],
+        foreground=[
+            ("pressed", "white"),
+            ("active", "white"),
+            ("disabled", "white"),
+            ("!active", "white"),
+        ],
+    )
+
 # Updates the background color of the app
-# Input: hex color string, animate (boolean)
+# Input: hex color string, animate (boolean), optional precomputed fade sequence (see build_fade_sequence)
 # Output: None
-def update_background_color(bg_color, animate=True):
-    global current_bg_color, previous_bg_color, fade_animation, current_button_color
-    
+@profiled("update_background_color")
+def update_background_color(bg_color, animate=True, sequence=None):
+    global previous_bg_color, fade_animation
+
     # Cancel any existing animation
     if fade_animation:
         root.after_cancel(fade_animation)
         fade_animation = None
-    
+
     if animate and previous_bg_color != bg_color:
-        # Animate the color transition
-        start_color = previous_bg_color
-        end_color = bg_color
-        duration = 500  # milliseconds
-        steps = 20
-        step_time = duration // steps
-        
+        # A prepared sequence only fits if it starts where the screen is now
+        if not sequence or sequence[0][0] != previous_bg_color or sequence[-1][0] != bg_color:
+            sequence = build_fade_sequence(previous_bg_color, bg_color)
+        step_time = FADE_DURATION_MS // (len(sequence) - 1)
+
         # Animation step function for color transition
         def animate_step(step):
-            global fade_animation, current_bg_color, current_button_color
-            
-            if step <= steps:
-                # Calculate interpolation factor
-                factor = step / steps
-                interpolated_color = interpolate_color(start_color, end_color, factor)
-                
-                # Apply the interpolated color
-                current_bg_color = interpolated_color
-                text_color = get_readable_text_color(interpolated_color)
-                current_button_color = darken_hex_color(interpolated_color)
-                
-                # Update UI elements
-                root.configure(bg=interpolated_color)
-                for frame in (
-                    genre_frame, list_frame, button_frame,
-                    swipe_frame, header_frame, swipe_button_frame,
-                    album_art_frame
-                ):
-                    frame.configure(bg=interpolated_color)
-                
-                for widget in (name_label, artist_label, progress_label, status_label, album_art_label):
-                    widget.configure(bg=interpolated_color, fg=text_color)
-                
-                genre_listbox.configure(
-                    bg=interpolated_color,
-                    fg=text_color,
-                    selectbackground=current_button_color,
-                    selectforeground="white"
-                )
-                
-                style.configure(
-                    "Green.TButton",
-                    background=current_button_color,
-                    foreground="white"
-                )
-                style.map(
-                    "Green.TButton",
-                    background=[
-                        ("pressed", current_button_color),
-                        ("active", current_button_color),
-                        ("disabled", current_button_color),
-                        ("!active", current_button_color),
-                    ],
-                    foreground=[
-                        ("pressed", "white"),
-                        ("active", "white"),
-                        ("disabled", "white"),
-                        ("!active", "white"),
-                    ],
-                )
-                
+            global fade_animation, previous_bg_color
+            if step < len(sequence):
+                apply_theme_colors(*sequence[step])
                 # Schedule next step
                 fade_animation = root.after(step_time, lambda: animate_step(step + 1))
             else:
                 # Animation complete
-                global previous_bg_color
                 fade_animation = None
-                previous_bg_color = end_color
-        
+                previous_bg_color = bg_color
+
         # Start animation
         animate_step(0)
     else:
         # No animation, just update directly
-        current_bg_color = bg_color
         previous_bg_color = bg_color
-        text_color = get_readable_text_color(bg_color)
-        current_button_color = darken_hex_color(bg_color)
-        
-        root.configure(bg=bg_color)
-        for frame in (
-            genre_frame, list_frame, button_frame,
-            swipe_frame, header_frame, swipe_button_frame,
-            album_art_frame
-        ):
-            frame.configure(bg=bg_color)
-        
-        for widget in (name_label, artist_label, progress_label, status_label, album_art_label):
-            widget.configure(bg=bg_color, fg=text_color)
-        
-        genre_listbox.configure(
-            bg=bg_color,
-            fg=text_color,
-            selectbackground=current_button_color,
-            selectforeground="white"
-        )
-        
-        style.configure(
-            "Green.TButton",
-            background=current_button_color,
-            foreground="white"
-        )
-        style.map(
-            "Green.TButton",
-            background=[
-                ("pressed", current_button_color),
-                ("active", current_button_color),
-                ("disabled", current_button_color),
-                ("!active", current_button_color),
-            ],
-            foreground=[
-                ("pressed", "white"),
-                ("active", "white"),
-                ("disabled", "white"),
-                ("!active", "white"),
-            ],
-        )
-    
+        apply_theme_colors(bg_color, get_readable_text_color(bg_color), darken_hex_color(bg_color))
+
     root.update_idletasks()
 
 # Stops audio playback of the song
@@ -270,14 +397,24 @@ def update_background_color(bg_color, animate=True):
 # Output: none (audio stops)
 def stop_audio():
     global player
-    if player:
-        try:
-            player.stop()
-            player.release()
-        except Exception as e:
-            print(f"Error stopping audio: {e}")
-        finally:
-            player = None
+    with player_lock:
+        if player:
+            try:
+                player.stop()
+                player.release()
+            except Exception as e:
+                print(f"Error stopping audio: {e}")
+            finally:
+                player = None
+
+# Stops the player if it belongs to a card that has been swiped past (run on audio_pool)
+# (a newer card may already have started its own player by the time this runs)
+# Input: none
+# Output: none (audio stops)
+def stop_stale_audio():
+    with player_lock:
+        if is_stale(player_generation):
+            stop_audio()
 
 # Gets the information of all liked tracks from Spotify
 # Input: Track dictionary
@@ -292,104 +429,508 @@ def _track_query(track_dict):
         print(f"Error building track query: {e}")
         return "", "Unknown", "Unknown"
 
+# Records the time between swipes in a moving average (long pauses are capped so one break doesn't skew it)
+# Input: none
+# Output: None (updates swipe_interval_estimate)
+def record_swipe():
+    global swipe_interval_estimate, last_swipe_time
+    now = time.monotonic()
+    with preload_lock:
+        if last_swipe_time is not None:
+            interval = min(now - last_swipe_time, 10 * PRELOAD_HORIZON_SECONDS)
+            swipe_interval_estimate += ESTIMATE_WEIGHT * (interval - swipe_interval_estimate)
+        last_swipe_time = now
+
+# Records how long a stream resolve took in a moving average
+# Input: seconds the resolve took
+# Output: None (updates resolve_latency_estimate)
+def record_resolve_latency(seconds):
+    global resolve_latency_estimate
+    with preload_lock:
+        resolve_latency_estimate += ESTIMATE_WEIGHT * (seconds - resolve_latency_estimate)
+
+# Picks how many tracks to preload so the buffer covers PRELOAD_HORIZON_SECONDS of swiping,
+# plus enough extra to hide the time it takes to resolve them
+# Input: none
+# Output: preload depth
+def current_preload_depth():
+    global preload_depth
+    with preload_lock:
+        interval = max(swipe_interval_estimate, 0.2)
+        depth = math.ceil((PRELOAD_HORIZON_SECONDS + resolve_latency_estimate) / interval)
+        preload_depth = max(PRELOAD_MIN, min(PRELOAD_MAX, depth))
+        return preload_depth
+
+# Reports the preloader's current decisions and how well they are working
+# Input: none
+# Output: dictionary of depth, estimates and hit/miss/expired/unused counts
+def get_preload_stats():
+    with preload_lock:
+        return dict(
+            preload_stats,
+            depth=preload_depth,
+            swipe_interval=round(swipe_interval_estimate, 2),
+            resolve_latency=round(resolve_latency_estimate, 2),
+        )
+
+# Resolves a track's best stream and records how long it took; the other candidates are kept as backups
+# Copies of a recording reuse one entry, so a song is only resolved again once its URL expires
+# Input: track dictionary
+# Output: stream entry dictionary (url, time it was resolved, remaining candidates, lock)
+def resolve_stream(track_dict):
+    key = mc.recording_key(track_dict)
+    with preload_lock:
+        entry = recording_streams.get(key)
+        if entry and entry["url"] and time.monotonic() - entry["time"] <= STREAM_URL_MAX_AGE:
+            recording_streams.move_to_end(key)
+            return entry
+
+    start = time.monotonic()
+    candidates = mc.iter_track_streams(track_dict)
+    stream_url = next(candidates, None)
+    record_resolve_latency(time.monotonic() - start)
+    if stream_url is None:
+        raise LookupError(f"No stream source has '{track_dict['track']['name']}'")
+    entry = {"url": stream_url, "time": time.monotonic(), "candidates": candidates, "lock": threading.RLock()}
+    with preload_lock:
+        recording_streams[key] = entry
+        while len(recording_streams) > RECORDING_STREAMS_MAX:
+            recording_streams.popitem(last=False)
+    return entry
+
+# Moves a stream entry on to its next backup candidate
+# Input: stream entry
+# Output: string of URL (None when no candidates are left)
+def next_stream_candidate(entry):
+    with entry["lock"]:
+        entry["url"] = next(entry["candidates"], None)
+        entry["time"] = time.monotonic()
+        return entry["url"]
+
+# Probes a preloaded stream and swaps in backups until one answers
+# (holds the entry's lock, so a card that wants this stream waits for the result)
+# Input: stream entry, track index, generation token of the card that preloaded it
+# Output: None (updates the entry)
+def validate_stream_entry(entry, index, generation):
+    with entry["lock"]:
+        while entry["url"] and not is_stale(generation):
+            if mc.probe_stream(entry["url"]):
+                return
+            with preload_lock:
+                preload_stats["probe_failures"] += 1
+            print(f"Stream for track {index} failed its health check, trying the next candidate")
+            next_stream_candidate(entry)
+
+# Plays a stream entry, switching to its next candidate if VLC reports an error
+# Input: stream entry, track index, generation token of the card, optional function run (on a new thread)
+#        when the stream ends
+# Output: boolean (False if the card was already swiped past)
+def start_playback(entry, index, generation, on_end=None):
+    global player, player_generation
+    with player_lock:
+        # Never let audio for an old card replace the current one
+        if is_stale(generation):
+            return False
+        stop_audio()
+        player = mc.instance.media_player_new()
+        player_generation = generation
+        player.set_media(mc.instance.media_new(entry["url"]))
+        # libvlc can't be called from inside its own event callbacks, so the fallback gets a thread
+        player.event_manager().event_attach(
+            vlc.EventType.MediaPlayerEncounteredError,
+            lambda event: threading.Thread(
+                target=fall_back_stream, args=(entry, index, generation), daemon=True
+            ).start()
+        )
+        if on_end:
+            player.event_manager().event_attach(
+                vlc.EventType.MediaPlayerEndReached,
+                lambda event: threading.Thread(target=on_end, daemon=True).start()
+            )
+        player.play()
+    return True
+
+# Plays a track's Spotify preview right away; if the user is still listening after
+# PREVIEW_RESOLVE_AFTER_SECONDS the full song is resolved, and it takes over when the clip ends
+# (a preview that fails to play falls back to the full song's candidates)
+# Input: track dictionary, preview URL, track index, generation token of the card
+# Output: boolean (False if the card was already swiped past)
+def start_preview_playback(track_dict, preview_url, index, generation):
+    entry = {
+        "url": preview_url,
+        "time": time.monotonic(),
+        "candidates": mc.iter_track_streams(track_dict),
+        "lock": threading.RLock(),
+    }
+    full_lock = threading.Lock()  # The clip ending mid-resolve waits for that resolve instead of starting another
+
+    def _resolve_full():
+        with full_lock:
+            if is_stale(generation):
+                return None
+            try:
+                full_entry = resolve_stream(track_dict)
+                validate_stream_entry(full_entry, index, generation)
+                return full_entry
+            except Exception as e:
+                print(f"Error resolving full song for track {index}: {e}")
+                return None
+
+    def _play_full():
+        if is_stale(generation):
+            return
+        # Already resolved by the timer in the usual case, so this is a cache hit
+        full_entry = _resolve_full()
+        if full_entry and full_entry["url"] and start_playback(full_entry, index, generation):
+            with preload_lock:
+                preload_stats["full_after_preview"] += 1
+            print(f"Preview ended, playing full song for track {index}")
+
+    if not start_playback(entry, index, generation, on_end=_play_full):
+        return False
+    timer = threading.Timer(PREVIEW_RESOLVE_AFTER_SECONDS, _resolve_full)
+    timer.daemon = True
+    timer.start()
+    return True
+
+# Replaces a stream that failed during playback with the next backup that passes a probe
+# Input: stream entry, track index, generation token of the card
+# Output: None (audio restarts)
+def fall_back_stream(entry, index, generation):
+    if is_stale(generation):
+        return
+    with preload_lock:
+        preload_stats["fallbacks"] += 1
+    print(f"Playback failed for track {index}, trying the next candidate")
+    while next_stream_candidate(entry):
+        if is_stale(generation):
+            return
+        if mc.probe_stream(entry["url"]):
+            start_playback(entry, index, generation)
+            return
+    print(f"No working stream left for track {index}")
+
 # Gets the URLs of future tracks (since it takes a while to load)
-# Input: start index for preloading
+# Input: start index for preloading, generation token of the card that started it
 # Output: None (preloads URLs into preloaded_stream_urls)
-def preload_next_tracks(start_index):
+def preload_next_tracks(start_index, generation=None):
     global preloaded_stream_urls
-    for i in range(start_index, min(start_index + PRELOAD_COUNT, len(tracks_to_swipe))):
+    depth = current_preload_depth()
+
+    # Drops URLs for cards that were swiped past before they were played
+    with preload_lock:
+        for i in [i for i in preloaded_stream_urls if i < start_index - 1]:
+            del preloaded_stream_urls[i]
+            preload_stats["unused"] += 1
+
+    for i in range(start_index, min(start_index + depth, len(tracks_to_swipe))):
+        # A newer card starts its own preloader, so this one can stop
+        if is_stale(generation):
+            return
+        track_dict = tracks_to_swipe[i]
+        # Tracks that start on their preview only need the full song if the user keeps listening
+        if mc.get_preview_url(track_dict, playback_mode):
+            continue
         with preload_lock:
-            if i in preloaded_stream_urls:
+            if i in preloaded_stream_urls or i in preloading_indices:
                 continue
+            preloading_indices.add(i)
         try:
-            track_dict = tracks_to_swipe[i]
             query, _, _ = _track_query(track_dict)
-            stream_url = mc.get_stream_url(query)
+            entry = resolve_stream(track_dict)
             with preload_lock:
-                preloaded_stream_urls[i] = stream_url
-            print(f"Preloaded track {i}: {query}")
+                # Deck may have been replaced while resolving
+                if is_stale(generation):
+                    return
+                preloaded_stream_urls[i] = entry
+            stream_probe_pool.submit(validate_stream_entry, entry, i, generation)
+            print(f"Preloaded track {i} (depth {depth}): {query}")
         except Exception as e:
             print(f"Error preloading track {i}: {e}")
+        finally:
+            with preload_lock:
+                preloading_indices.discard(i)
+
+# Builds everything a card needs to go on screen: text, colors and its cover (decoded into the image cache)
+# Input: deck (list of tracks), track index
+# Output: prepared card dictionary (image_key is None when the track has no usable cover)
+@profiled("prepare_card")
+def prepare_card(deck, index):
+    track_dict = deck[index]
+    _, track_name, artists = _track_query(track_dict)
+    card = {
+        "track": track_dict,
+        "name": track_name,
+        "artists": artists,
+        "progress": f"{index + 1}/{len(deck)}",
+        "image_key": None,
+        "bg_color": DEFAULT_BG_COLOR,
+        "fade": None,
+    }
+    image_key = album_cache_key(track_dict)
+    if image_key:
+        cached = get_cached_image(image_key)
+        if cached is None:
+            # No generation token: a card being prepared is still wanted after the next swipe
+            pil_img, tk_img, bg_color = load_image_from_url(track_dict["track"]["album"]["images"][0]["url"])
+            if pil_img and tk_img:
+                put_cached_image(image_key, pil_img, tk_img, bg_color)
+                cached = (pil_img, tk_img, bg_color)
+        if cached:
+            card["image_key"] = image_key
+            card["bg_color"] = cached[2]
+    return card
+
+# Keeps the next CARD_QUEUE_SIZE cards prepared, each with its fade from the card before it
+# Input: index of the first upcoming card, generation token of the card that started it
+# Output: None (fills prepared_cards)
+def prepare_upcoming_cards(start_index, generation):
+    deck = tracks_to_swipe
+
+    # Drops cards that were swiped past, which also keeps the queue bounded
+    with card_lock:
+        for i in [i for i in prepared_cards if i < start_index or i >= start_index + CARD_QUEUE_SIZE]:
+            del prepared_cards[i]
+
+    previous_bg = target_bg_color
+    for i in range(start_index, min(start_index + CARD_QUEUE_SIZE, len(deck))):
+        # A newer card starts its own preparer, so this one can stop
+        if is_stale(generation):
+            return
+        with card_lock:
+            card = prepared_cards.get(i)
+            if card is None and i in preparing_indices:
+                previous_bg = None
+                continue
+            if card is None:
+                preparing_indices.add(i)
+        if card is None:
+            try:
+                card = prepare_card(deck, i)
+            except Exception as e:
+                print(f"Error preparing card {i}: {e}")
+                previous_bg = None
+                continue
+            finally:
+                with card_lock:
+                    preparing_indices.discard(i)
+            with card_lock:
+                # Deck may have been replaced while preparing
+                if tracks_to_swipe is not deck:
+                    return
+                prepared_cards[i] = card
+        card["fade"] = build_fade_sequence(previous_bg, card["bg_color"]) if previous_bg else None
+        previous_bg = card["bg_color"]
+
+# Records how long it took from a swipe until the next card was fully on screen
+# Input: whether the card had been prepared ahead of time
+# Output: None (updates render_stats)
+def record_render_latency(prepared):
+    global swipe_started_at
+    if swipe_started_at is None:
+        return
+    elapsed_ms = 1000 * (time.perf_counter() - swipe_started_at)
+    swipe_started_at = None
+    stats = render_stats["prepared" if prepared else "unprepared"]
+    stats["cards"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+# Reports swipe-to-render latency for prepared and unprepared cards
+# Input: none
+# Output: dictionary of card counts with mean and max latency in ms
+def get_render_stats():
+    return {
+        kind: {
+            "cards": stats["cards"],
+            "mean_ms": round(stats["total_ms"] / stats["cards"], 1) if stats["cards"] else None,
+            "max_ms": round(stats["max_ms"], 1),
+        }
+        for kind, stats in render_stats.items()
+    }
 
 # Creates a new screen for the current track
-# Input: track dictionary
+# Input: track dictionary, generation token for this card
 # Output: None (updates UI elements)
-def update_ui_for_track(track_dict):
+def update_ui_for_track(track_dict, generation):
     global album_photo, current_bg_color, current_track_index, player
-    _, track_name, artists = _track_query(track_dict)
+    global card_shown_time
+    index = current_track_index
+    card_shown_time = time.monotonic()
+
+    # A prepared card already has its text, cover and fade
+    with card_lock:
+        card = prepared_cards.pop(index, None)
+    if card and card["track"] is not track_dict:
+        card = None
+    if card:
+        track_name, artists, progress = card["name"], card["artists"], card["progress"]
+    else:
+        _, track_name, artists = _track_query(track_dict)
+        progress = f"{index + 1}/{len(tracks_to_swipe)}"
     name_label.config(text=track_name)
     artist_label.config(text=artists)
-    progress_label.config(text=f"{current_track_index + 1}/{len(tracks_to_swipe)}")
+    progress_label.config(text=progress)
 
-    album_art_label.config(image="", text="Loading...")
-    root.update_idletasks()
+    # Shows the album art and background color (main thread only)
+    def _apply(key, tk_img, bg_color, fade=None):
+        global album_photo, previous_bg_color, displayed_image_key, target_bg_color
+        if is_stale(generation):
+            return
+        album_art_label.config(image=tk_img, text="")
+        album_art_label.image = tk_img
+        album_photo = tk_img
+        displayed_image_key = key
+        previous_bg_color = current_bg_color
+        target_bg_color = bg_color
+        update_background_color(bg_color, sequence=fade)
+        record_render_latency(card is not None)
+
+    # Shows the no-cover placeholder (main thread only)
+    def _show_no_image(fade=None):
+        global target_bg_color
+        if is_stale(generation):
+            return
+        album_art_label.config(image="", text="No Image")
+        target_bg_color = DEFAULT_BG_COLOR
+        update_background_color(DEFAULT_BG_COLOR, sequence=fade)
+        record_render_latency(card is not None)
+
+    # Revisited albums skip the download and decode entirely
+    if card:
+        image_key = card["image_key"]
+    else:
+        try:
+            image_key = album_cache_key(track_dict)
+        except Exception as e:
+            print(f"Error reading album info: {e}")
+            image_key = None
+    cached = get_cached_image(image_key) if image_key else None
+    if cached:
+        _, tk_img, bg_color = cached
+        _apply(image_key, tk_img, bg_color, card["fade"] if card else None)
+    elif card and image_key is None:
+        # Preparing already found there is no usable cover
+        _show_no_image(card["fade"])
+    else:
+        album_art_label.config(image="", text="Loading...")
+        root.update_idletasks()
 
     # Load album art and background color in a separate thread
     def _load_art_bg():
-        global album_photo, current_bg_color
+        if is_stale(generation):
+            return
         try:
             images = track_dict["track"]["album"].get("images", [])
             img_url = images[0]["url"] if images else None
             if img_url:
-                pil_img, tk_img = load_image_from_url(img_url)
+                pil_img, tk_img, bg_color = load_image_from_url(img_url, generation=generation)
                 if pil_img and tk_img:
-                    bg_color = get_dominant_color(pil_img)
+                    put_cached_image(image_key, pil_img, tk_img, bg_color)
                     # Apply the album art and background color on the main thread
-                    def _apply():
-                        global previous_bg_color
-                        album_art_label.config(image=tk_img, text="")
-                        album_art_label.image = tk_img
-                        previous_bg_color = current_bg_color
-                        update_background_color(bg_color)
-                    root.after(0, _apply)
+                    root.after(0, lambda: _apply(image_key, tk_img, bg_color))
+                    return
+                if is_stale(generation):
                     return
         except Exception as e:
             print(f"Error loading album art: {e}")
 
         # Fallback when image loading fails
-        def _fallback():
-            album_art_label.config(image="", text="No Image")
-            update_background_color("#f0f0f0")
-        root.after(0, _fallback)
+        root.after(0, _show_no_image)
+
+    if not cached and not (card and image_key is None):
+        threading.Thread(target=_load_art_bg, daemon=True).start()
 
-    threading.Thread(target=_load_art_bg, daemon=True).start()
+    # Gets the cards after this one ready while it plays
+    threading.Thread(target=prepare_upcoming_cards, args=(index + 1, generation), daemon=True).start()
 
     # Play audio in a separate thread to avoid blocking UI
     def _play_audio_bg():
-        global player
-        stop_audio()
-        stream_url = None
+        if is_stale(generation):
+            return
+
+        # Preview mode skips the resolver entirely for tracks that have a Spotify clip
+        preview_url = mc.get_preview_url(track_dict, playback_mode)
+        if preview_url:
+            with preload_lock:
+                preload_stats["previews"] += 1
+            try:
+                if start_preview_playback(track_dict, preview_url, index, generation):
+                    print(f"Playing preview of track {index}: {track_name} by {artists}")
+                    threading.Thread(target=preload_next_tracks, args=(index + 1, generation), daemon=True).start()
+            except Exception as e:
+                print(f"Error playing preview: {e}")
+            return
+
+        entry = None
         with preload_lock:
-            stream_url = preloaded_stream_urls.pop(current_track_index, None)
+            preloaded = preloaded_stream_urls.pop(index, None)
+            if preloaded and time.monotonic() - preloaded["time"] > STREAM_URL_MAX_AGE:
+                preload_stats["expired"] += 1
+            elif preloaded:
+                entry = preloaded
+                preload_stats["hits"] += 1
+            else:
+                preload_stats["misses"] += 1
         try:
-            if not stream_url:
+            if entry is None:
                 query, _, _ = _track_query(track_dict)
-                print(f"Fetching stream URL live for track {current_track_index}: {query}")
-                stream_url = mc.get_stream_url(query)
-            player = mc.instance.media_player_new()
-            media = mc.instance.media_new(stream_url)
-            player.set_media(media)
-            player.play()
-            print(f"Playing track {current_track_index}: {track_name} by {artists}")
-            threading.Thread(target=preload_next_tracks, args=(current_track_index + 1,), daemon=True).start()
+                print(f"Fetching stream URL live for track {index}: {query}")
+                entry = resolve_stream(track_dict)
+
+            # Waits for a health check that is still running on this stream
+            with entry["lock"]:
+                stream_url = entry["url"]
+            if not stream_url:
+                print(f"No working stream for track {index}: {track_name}")
+                return
+            if not start_playback(entry, index, generation):
+                return
+            print(f"Playing track {index}: {track_name} by {artists}")
+            threading.Thread(target=preload_next_tracks, args=(index + 1, generation), daemon=True).start()
         except Exception as e:
             print(f"Error playing audio: {e}")
 
-    threading.Thread(target=_play_audio_bg, daemon=True).start()
+    # Wait briefly before resolving so cards skipped in rapid succession never hit the network
+    def _start_audio():
+        if not is_stale(generation):
+            threading.Thread(target=_play_audio_bg, daemon=True).start()
+
+    root.after(AUDIO_SETTLE_MS, _start_audio)
 
 # Shows the next track in the list
 # Input: none
 # Output: None (updates UI elements)
 def show_next_track():
-    global current_track_index
+    global swipe_generation, swipe_started_at
+    swipe_generation += 1
+    swipe_started_at = time.perf_counter()
+    audio_pool.submit(stop_stale_audio)
     if current_track_index >= len(tracks_to_swipe):
-        stop_audio()
         messagebox.showinfo("Done", "No more songs to swipe!")
         return
-    left_btn.config(state=tk.DISABLED)
-    right_btn.config(state=tk.DISABLED)
-    root.after(100, lambda: update_ui_for_track(tracks_to_swipe[current_track_index]))
-    root.after(200, lambda: [left_btn.config(state=tk.NORMAL), right_btn.config(state=tk.NORMAL)])
+    update_ui_for_track(tracks_to_swipe[current_track_index], swipe_generation)
+
+# Stores a swipe with its dwell time, genres and subgenres in the analytics database
+# Input: track dictionary, liked (boolean)
+# Output: None (the write happens on analytics_pool)
+def log_swipe_analytics(track_dict, liked):
+    dwell_ms = 1000 * (time.monotonic() - card_shown_time) if card_shown_time else 0
+    t = track_dict["track"]
+    genres = deck_track_genres.get(t["id"], [])
+    subgenres = []
+    for artist in t["artists"]:
+        subgenres.extend(artist_genres_global.get(artist["id"], {}).get("subgenres", []))
+
+    def _write():
+        global analytics_store
+        try:
+            if analytics_store is None:
+                analytics_store = analytics.open_store()
+            analytics.record_swipe(analytics_store, track_dict, liked, dwell_ms, genres, subgenres)
+        except Exception as e:
+            print(f"Error recording swipe: {e}")
+    analytics_pool.submit(_write)
 
 # Adds the current track to the right swipes list and shows the next track
 # Input: none
@@ -398,6 +939,8 @@ def swipe_right():
     global current_track_index, right_swipes
     if current_track_index < len(tracks_to_swipe):
         right_swipes.append(tracks_to_swipe[current_track_index])
+        log_swipe_analytics(tracks_to_swipe[current_track_index], True)
+        record_swipe()
         current_track_index += 1
         show_next_track()
 
@@ -407,25 +950,36 @@ def swipe_right():
 def swipe_left():
     global current_track_index
     if current_track_index < len(tracks_to_swipe):
+        log_swipe_analytics(tracks_to_swipe[current_track_index], False)
+        record_swipe()
         current_track_index += 1
         show_next_track()
 
+# Switches between starting cards on their Spotify preview and always playing the full song
+# Input: none
+# Output: None (applies from the next card)
+def on_playback_mode_change():
+    global playback_mode
+    playback_mode = "preview" if preview_mode_var.get() else "full"
+
+# Swipes with the arrow keys so power users can move through the deck quickly
+# Input: Tkinter key event
+# Output: None (swipes the current track)
+def on_swipe_key(event):
+    if not swipe_frame.winfo_ismapped():
+        return
+    if event.keysym == "Right":
+        swipe_right()
+    elif event.keysym == "Left":
+        swipe_left()
+
 # Combines tracks from selected genres into a single list to be swiped through
 # Input: list of selected genres, dictionary of song genres
 # Output: combined list of tracks
 def combine_tracks(selected_genres, song_genres):
-    combined = []
-    seen_ids = set()
-    for genre in selected_genres:
-        if genre in song_genres:
-            for track in song_genres[genre]:
-                tid = track["track"]["id"]
-                if tid not in seen_ids:
-                    combined.append(track)
-                    seen_ids.add(tid)
-        else:
-            messagebox.showwarning("Warning", f"Genre '{genre}' not found.")
-    random.shuffle(combined)
+    combined, missing_genres = mc.combine_genre_tracks(selected_genres, song_genres)
+    for genre in missing_genres:
+        messagebox.showwarning("Warning", f"Genre '{genre}' not found.")
     return combined
 
 # Start swiping process when the user clicks the start button
@@ -444,8 +998,15 @@ def on_start_swiping():
     selected_genres = [genre_listbox.get(i).split(" (")[0] for i in selected_indices]
     # Process and shuffle tracks in a background thread
     def process_tracks():
-        global tracks_to_swipe, current_track_index, right_swipes, loading, preloaded_stream_urls
+        global tracks_to_swipe, current_track_index, right_swipes, loading, preloaded_stream_urls, last_swipe_time
+        global deck_track_genres, target_bg_color
         combined_tracks = combine_tracks(selected_genres, song_genres_global)
+
+        # Remembers which selected genres each track came from for swipe analytics
+        deck_track_genres = {}
+        for genre in selected_genres:
+            for track in song_genres_global.get(genre, []):
+                deck_track_genres.setdefault(track["track"]["id"], []).append(genre)
         if not combined_tracks:
             messagebox.showinfo("No Songs", "No songs found for those genres.")
             loading = False
@@ -456,6 +1017,10 @@ def on_start_swiping():
         current_track_index = 0
         right_swipes = []
         preloaded_stream_urls = {}
+        with card_lock:
+            prepared_cards.clear()
+        target_bg_color = current_bg_color
+        last_swipe_time = None
         genre_frame.pack_forget()
         swipe_frame.pack(fill="both", expand=True)
         show_next_track()
@@ -463,30 +1028,85 @@ def on_start_swiping():
         start_button.config(state=tk.NORMAL, text="Start Swiping")
     threading.Thread(target=process_tracks, daemon=True).start()
 
-# Gets all liked tracks from Spotify
-# Input: Spotify client object
-# Output: list of liked tracks
+# Redraws the genre list with new counts while keeping the user's selection and scroll position
+# Input: dictionary of genre to track count
+# Output: None (updates the genre listbox)
+def refresh_genre_listbox(genre_counts):
+    selected = {genre_listbox.get(i).split(" (")[0] for i in genre_listbox.curselection()}
+    scroll_position = genre_listbox.yview()[0]
+    genre_listbox.delete(0, tk.END)
+    sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)
+    for genre, count in sorted_genres:
+        genre_listbox.insert(tk.END, f"{genre} ({count})")
+        if genre in selected:
+            genre_listbox.selection_set(tk.END)
+    genre_listbox.yview_moveto(scroll_position)
+
+# Gets all liked tracks from Spotify, showing genres as soon as the first pages are sorted
+# Input: none
+# Output: None (fills the genre listbox)
 def fetch_and_load_genres():
-    global loading, total_songs
+    global loading, total_songs, song_genres_global
     loading = True
     genre_listbox.delete(0, tk.END)
     status_label.config(text="Loading your music data...")
     start_button.config(state=tk.DISABLED, text="Loading...")
     root.update()
+
+    # Called from this worker thread after each page; UI changes go through the main loop
+    def _on_update(songs_genres, loaded, total):
+        global song_genres_global, total_songs
+        song_genres_global = songs_genres
+        total_songs = loaded
+        genre_counts = {genre: len(tracks) for genre, tracks in songs_genres.items()}
+        def _apply():
+            refresh_genre_listbox(genre_counts)
+            if genre_frame.winfo_ismapped():
+                status_label.config(text=f"Loading your music data... {loaded}/{total} tracks")
+            start_button.config(state=tk.NORMAL, text="Start Swiping")
+        root.after(0, _apply)
+
+    # Starts from the saved snapshot right away and refreshes it quietly in the background
+    # (an unreadable snapshot is ignored, so the library is fetched from Spotify as if there were none)
     try:
-        liked_tracks = mc.get_all_liked_tracks(mc.sp)
-        artist_ids = mc.get_artist_ids_from_tracks(liked_tracks)
-        artist_genres = mc.get_artist_genres(mc.sp, artist_ids)
-        global song_genres_global
-        song_genres_global = mc.liked_songs_genre(liked_tracks, artist_genres)
-        sorted_genres = sorted(song_genres_global.items(), key=lambda x: len(x[1]), reverse=True)
-        for genre, tracks in sorted_genres:
-            genre_listbox.insert(tk.END, f"{genre} ({len(tracks)})")
-        status_label.config(text=f"Found {len(liked_tracks)} tracks across {len(sorted_genres)} genres")
+        snapshot = library_snapshot.load_snapshot(mc.LIBRARY_SNAPSHOT_PATH)
+        if snapshot:
+            snapshot_genres = snapshot.genre_buckets()
+            snapshot_counts = {genre: len(tracks) for genre, tracks in snapshot_genres.items()}
+    except Exception as e:
+        print(f"Ignoring library snapshot: {e}")
+        snapshot = None
+    if snapshot:
+        song_genres_global = snapshot_genres
+        total_songs = snapshot.track_count
+        def _show_snapshot():
+            refresh_genre_listbox(snapshot_counts)
+            status_label.config(text=f"Found {total_songs} tracks across {len(snapshot_counts)} genres (refreshing...)")
+            start_button.config(state=tk.NORMAL, text="Start Swiping")
+        root.after(0, _show_snapshot)
+
+    try:
+        liked_tracks, genres_by_artist, songs_genres = mc.load_liked_songs_progressively(
+            mc.sp, None if snapshot else _on_update, artist_genres_global
+        )
+        song_genres_global = songs_genres
         total_songs = len(liked_tracks)
+        try:
+            library_snapshot.save_snapshot(mc.LIBRARY_SNAPSHOT_PATH, liked_tracks, genres_by_artist, songs_genres)
+        except OSError as e:
+            print(f"Error saving library snapshot: {e}")
+        def _done():
+            refresh_genre_listbox({genre: len(tracks) for genre, tracks in song_genres_global.items()})
+            if genre_frame.winfo_ismapped():
+                status_label.config(text=f"Found {total_songs} tracks across {len(song_genres_global)} genres")
+        root.after(0, _done)
     except Exception as e:
-        messagebox.showerror("Error", f"Failed to load data: {str(e)}")
-        status_label.config(text="Error loading data")
+        if snapshot:
+            print(f"Error refreshing library: {e}")
+            root.after(0, lambda: status_label.config(text=f"Using saved library ({total_songs} tracks)"))
+        else:
+            messagebox.showerror("Error", f"Failed to load data: {str(e)}")
+            status_label.config(text="Error loading data")
     finally:
         loading = False
         start_button.config(state=tk.NORMAL, text="Start Swiping")
@@ -495,7 +1115,10 @@ def fetch_and_load_genres():
 # Input: none
 # Output: None (updates UI elements)
 def return_to_genres():
-    stop_audio()
+    global swipe_generation
+    # Drops any art, audio or preload work still running for the old deck
+    swipe_generation += 1
+    audio_pool.submit(stop_stale_audio)
     swipe_frame.pack_forget()
     genre_frame.pack(fill="both", expand=True)
     # Reset colors to default when returning to genre selection
@@ -511,8 +1134,21 @@ def create_playlist():
     if not right_swipes:
         messagebox.showinfo("No Songs", "You haven't swiped right on any songs yet!")
         return
-    playlist_name = f"SwipeBeats Selection - {len(right_swipes)} songs"
     track_uris = [track["track"]["uri"] for track in right_swipes]
+
+    # Appends only the songs that aren't already in the user's SwipeBeats playlist
+    if append_to_playlist_var.get():
+        try:
+            _, added, skipped = mc.append_to_target_playlist(mc.sp, track_uris)
+            messagebox.showinfo(
+                "Success",
+                f"Added {added} new songs to '{mc.TARGET_PLAYLIST_NAME}' ({skipped} were already there)"
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to update playlist: {str(e)}")
+        return
+
+    playlist_name = f"SwipeBeats Selection - {len(right_swipes)} songs"
     try:
         user_id = mc.sp.current_user()["id"]
         playlist = mc.sp.user_playlist_create(
@@ -532,6 +1168,10 @@ def create_playlist():
 # Output: None (closes the app)
 def on_close():
     stop_audio()
+    print(f"Image cache: {get_image_cache_stats()}")
+    print(f"Preloader: {get_preload_stats()}")
+    print(f"Swipe-to-render: {get_render_stats()}")
+    print(f"HTTP: {http_pool.get_connection_stats()}")
     root.destroy()
 
 #######################################################################################
@@ -775,6 +1415,10 @@ right_btn = ttk.Button(
 )
 right_btn.pack(side="left", padx=10)
 
+# Arrow keys for rapid swiping
+root.bind("<Left>", on_swipe_key)
+root.bind("<Right>", on_swipe_key)
+
 # Button to create playlist from liked songs
 create_playlist_btn = ttk.Button(
     swipe_frame,
@@ -782,10 +1426,44 @@ create_playlist_btn = ttk.Button(
     command=create_playlist,
     style="Green.TButton",
 )
-create_playlist_btn.pack(pady=20)
+create_playlist_btn.pack(pady=(20, 5))
+
+# Option to append to one running SwipeBeats playlist instead of making a new one
+append_to_playlist_var = tk.BooleanVar(value=False)
+append_checkbox = tk.Checkbutton(
+    swipe_frame,
+    text=f"Add to '{mc.TARGET_PLAYLIST_NAME}' (skip songs already there)",
+    variable=append_to_playlist_var,
+    font=label_font,
+    bg=current_bg_color,
+    fg=get_readable_text_color(current_bg_color),
+    selectcolor=current_bg_color,
+    highlightthickness=0,
+    borderwidth=0,
+)
+append_checkbox.pack()
+
+# Option to start each card on its Spotify preview (the full song is only fetched if you keep listening)
+preview_mode_var = tk.BooleanVar(value=playback_mode == "preview")
+preview_checkbox = tk.Checkbutton(
+    swipe_frame,
+    text="Quick previews (play Spotify's clip first)",
+    variable=preview_mode_var,
+    command=on_playback_mode_change,
+    font=label_font,
+    bg=current_bg_color,
+    fg=get_readable_text_color(current_bg_color),
+    selectcolor=current_bg_color,
+    highlightthickness=0,
+    borderwidth=0,
+)
+preview_checkbox.pack()
 
 # Load genres on startup
 threading.Thread(target=fetch_and_load_genres, daemon=True).start()
 
+# Index the local music library (if configured) while genres load
+threading.Thread(target=mc.load_local_library, daemon=True).start()
+
 # Start the GUI event loop
 root.mainloop()
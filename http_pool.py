@@ -0,0 +1,131 @@
+# Chase Vitale
+# SwipeBeats
+
+# Shared HTTP layer: one keep-alive session for Spotify, album art and other lookups, with per-host
+# connection pools capped per host, a cap on requests in flight, cached DNS lookups and per-call timeouts
+
+# Import statements
+import os
+import time
+import atexit
+import socket
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+#######################################################################################
+
+# Initializations
+
+MAX_HOSTS = 16  # Hosts that keep their own pool of idle connections
+MAX_CONNECTIONS_PER_HOST = 8  # Hard cap: extra requests to a busy host wait for one of its connections
+MAX_REQUESTS_IN_FLIGHT = int(os.getenv("SWIPEBEATS_MAX_REQUESTS_IN_FLIGHT", "32"))  # Until each response returns
+DNS_CACHE_TTL = 300  # Seconds a DNS answer is reused
+
+# Default timeouts (connect, read) in seconds; any call can pass its own
+DEFAULT_TIMEOUT = (5, 15)
+SPOTIFY_TIMEOUT = 10
+ART_TIMEOUT = (3, 10)
+
+dns_cache = {}  # getaddrinfo arguments -> (expiry time, result)
+dns_lock = threading.Lock()
+request_slots = threading.BoundedSemaphore(MAX_REQUESTS_IN_FLIGHT)
+http_stats = {"requests": 0, "dns_hits": 0, "dns_misses": 0}
+stats_lock = threading.Lock()
+
+#######################################################################################
+
+# DNS caching
+
+uncached_getaddrinfo = socket.getaddrinfo
+
+# Resolves a host once per DNS_CACHE_TTL instead of on every new connection
+# Input: same as socket.getaddrinfo
+# Output: same as socket.getaddrinfo
+def cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with dns_lock:
+        entry = dns_cache.get(key)
+        if entry and entry[0] > now:
+            http_stats["dns_hits"] += 1
+            return entry[1]
+    result = uncached_getaddrinfo(host, port, family, type, proto, flags)
+    with dns_lock:
+        dns_cache[key] = (now + DNS_CACHE_TTL, result)
+        http_stats["dns_misses"] += 1
+    return result
+
+# Caches DNS answers for every library in the process (requests, spotipy and yt-dlp all resolve through socket)
+socket.getaddrinfo = cached_getaddrinfo
+
+#######################################################################################
+
+# Session
+
+# Same retry policy spotipy uses on its own session (backs off on 429 using Retry-After)
+RETRY_POLICY = Retry(
+    total=3,
+    connect=None,
+    read=False,
+    status=3,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+)
+
+# requests.Session that caps connections per host and requests in flight, applies a default timeout and
+# counts requests (a streamed response keeps its connection, and so its host's slot, until it is closed)
+# close() is a no-op because every spotipy client shares this session and spotipy closes its session when a
+# client is garbage collected; the real pools are closed once, at exit
+class PooledSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        # pool_block makes the per-host size a real limit instead of opening throwaway connections past it
+        adapter = HTTPAdapter(
+            pool_connections=MAX_HOSTS, pool_maxsize=MAX_CONNECTIONS_PER_HOST, max_retries=RETRY_POLICY,
+            pool_block=True
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.adapter = adapter
+
+    def close(self):
+        pass
+
+    def close_pools(self):
+        super().close()
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = DEFAULT_TIMEOUT
+        with stats_lock:
+            http_stats["requests"] += 1
+        with request_slots:
+            return super().request(method, url, **kwargs)
+
+session = PooledSession()
+atexit.register(session.close_pools)
+
+# Sends a GET through the shared session
+# Input: URL, optional timeout (seconds or (connect, read)), other requests arguments
+# Output: requests.Response
+def get(url, timeout=None, **kwargs):
+    return session.get(url, timeout=timeout, **kwargs)
+
+# Reports how well connections and DNS answers are being reused
+# Input: none
+# Output: dictionary of request, connection and DNS counts
+def get_connection_stats():
+    pools = session.adapter.poolmanager.pools
+    opened = 0
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+            opened += pool.num_connections
+    with stats_lock:
+        stats = dict(http_stats)
+    stats["connections_opened"] = opened
+    stats["connection_reuse"] = round(1 - opened / stats["requests"], 3) if stats["requests"] else 0.0
+    return stats
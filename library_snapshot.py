@@ -0,0 +1,271 @@
+# Chase Vitale
+# SwipeBeats
+
+# Library snapshots: a compact columnar file of tracks, artists and genre buckets that loads with mmap
+# so the app can start without re-fetching or re-parsing the whole library
+
+# Import statements
+import os
+import mmap
+import struct
+from array import array
+from collections.abc import Sequence
+
+#######################################################################################
+
+# Initializations
+
+SNAPSHOT_MAGIC = b"SWBS"
+SNAPSHOT_VERSION = 1
+BYTE_ORDER_MARK = 0x01020304  # Read back differently on a machine with the other byte order
+
+# Every section is a native-endian array of unsigned 32-bit ints, except the string data blob
+SECTIONS = [
+    "string_offsets",        # start of each interned string in string_data (plus one end offset)
+    "track_id",              # string index per track
+    "track_uri",
+    "track_name",
+    "track_duration",        # duration_ms per track
+    "track_album_id",
+    "track_image",
+    "track_isrc",
+    "track_preview",
+    "track_artist_offsets",  # start of each track's artists in track_artists (plus one end offset)
+    "track_artists",         # artist index per track/artist pair
+    "artist_id",             # string index per artist
+    "artist_name",
+    "artist_genre_offsets",  # start of each artist's genres in artist_genres (plus one end offset)
+    "artist_genres",         # genre index per artist/genre pair
+    "genre_names",           # string index per genre bucket
+    "bucket_offsets",        # start of each bucket in bucket_tracks (plus one end offset)
+    "bucket_tracks",         # track index per bucket entry
+]
+HEADER = struct.Struct(f"=4sII{len(SECTIONS) + 1}Q{len(SECTIONS) + 1}Q")
+
+#######################################################################################
+
+# Writing
+
+# Collects strings into a table so every repeated name, id or URL is stored once
+class StringTable:
+    def __init__(self):
+        self.indices = {"": 0}
+        self.strings = [""]
+
+    def add(self, text):
+        text = text or ""
+        index = self.indices.get(text)
+        if index is None:
+            index = self.indices[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+# Writes the library to a snapshot file atomically (readers never see a half-written file)
+# Input: path, list of tracks, dictionary of artists and genres, dictionary of genre buckets
+# Output: none
+def save_snapshot(path, tracks, genres_by_artist, songs_genres):
+    strings = StringTable()
+    columns = {name: array("I") for name in SECTIONS}
+
+    genre_names = list(songs_genres)
+    genre_index = {genre: i for i, genre in enumerate(genre_names)}
+    artist_index = {}
+
+    # Artist table
+    def _artist(artist_id, name):
+        index = artist_index.get(artist_id)
+        if index is None:
+            index = artist_index[artist_id] = len(columns["artist_id"])
+            columns["artist_id"].append(strings.add(artist_id))
+            columns["artist_name"].append(strings.add(name))
+            columns["artist_genre_offsets"].append(len(columns["artist_genres"]))
+            for genre in (genres_by_artist.get(artist_id) or {}).get("genres", []):
+                if genre in genre_index:
+                    columns["artist_genres"].append(genre_index[genre])
+        return index
+
+    # Track columns
+    track_index = {}
+    for track in tracks:
+        t = track["track"]
+        track_index[id(track)] = len(columns["track_id"])
+        images = t.get("album", {}).get("images") or []
+        columns["track_id"].append(strings.add(t.get("id")))
+        columns["track_uri"].append(strings.add(t.get("uri")))
+        columns["track_name"].append(strings.add(t.get("name")))
+        columns["track_duration"].append(t.get("duration_ms") or 0)
+        columns["track_album_id"].append(strings.add(t.get("album", {}).get("id")))
+        columns["track_image"].append(strings.add(images[0]["url"] if images else None))
+        columns["track_isrc"].append(strings.add((t.get("external_ids") or {}).get("isrc")))
+        columns["track_preview"].append(strings.add(t.get("preview_url")))
+        columns["track_artist_offsets"].append(len(columns["track_artists"]))
+        for artist in t["artists"]:
+            columns["track_artists"].append(_artist(artist["id"], artist["name"]))
+    columns["track_artist_offsets"].append(len(columns["track_artists"]))
+    columns["artist_genre_offsets"].append(len(columns["artist_genres"]))
+
+    # Genre buckets
+    for genre in genre_names:
+        columns["genre_names"].append(strings.add(genre))
+        columns["bucket_offsets"].append(len(columns["bucket_tracks"]))
+        for track in songs_genres[genre]:
+            if id(track) in track_index:
+                columns["bucket_tracks"].append(track_index[id(track)])
+    columns["bucket_offsets"].append(len(columns["bucket_tracks"]))
+
+    # String table (built last because the columns above add to it)
+    string_data = bytearray()
+    for text in strings.strings:
+        columns["string_offsets"].append(len(string_data))
+        string_data += text.encode("utf-8")
+    columns["string_offsets"].append(len(string_data))
+
+    # Lays the sections out after the header, each 8-byte aligned
+    blobs = [columns[name].tobytes() for name in SECTIONS] + [bytes(string_data)]
+    offsets, lengths = [], []
+    position = HEADER.size
+    for blob in blobs:
+        position += -position % 8
+        offsets.append(position)
+        lengths.append(len(blob))
+        position += len(blob)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, BYTE_ORDER_MARK, *offsets, *lengths))
+        for offset, blob in zip(offsets, blobs):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+#######################################################################################
+
+# Reading
+
+# Read-only view of a snapshot file; fields are decoded only when a track is asked for
+class LibrarySnapshot:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, byte_order, *positions = HEADER.unpack_from(self.mm)
+        except struct.error:
+            self.mm.close()
+            raise
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or byte_order != BYTE_ORDER_MARK:
+            self.mm.close()
+            raise ValueError(f"{path} is not a compatible library snapshot")
+
+        # A short or damaged file must never turn into silently truncated columns
+        offsets, lengths = positions[:len(SECTIONS) + 1], positions[len(SECTIONS) + 1:]
+        for i, (offset, length) in enumerate(zip(offsets, lengths)):
+            if offset + length > len(self.mm) or (i < len(SECTIONS) and (offset % 4 or length % 4)):
+                self.mm.close()
+                raise ValueError(f"{path} is truncated or corrupt")
+
+        # Zero-copy int arrays straight over the mapped file
+        self.view = view = memoryview(self.mm)
+        self.columns = {
+            name: view[offset:offset + length].cast("I")
+            for name, offset, length in zip(SECTIONS, offsets, lengths)
+        }
+        self.string_data = view[offsets[-1]:offsets[-1] + lengths[-1]]
+        self.track_count = len(self.columns["track_id"])
+        if not self.is_consistent():
+            self.close()
+            raise ValueError(f"{path} is truncated or corrupt")
+
+    # Checks that the offset tables agree with the sections they point into
+    def is_consistent(self):
+        c = self.columns
+        tracks, artists, genres = self.track_count, len(c["artist_id"]), len(c["genre_names"])
+        track_columns = ["track_uri", "track_name", "track_duration", "track_album_id", "track_image",
+                         "track_isrc", "track_preview"]
+        offset_tables = [
+            ("string_offsets", len(self.string_data)),
+            ("track_artist_offsets", len(c["track_artists"])),
+            ("artist_genre_offsets", len(c["artist_genres"])),
+            ("bucket_offsets", len(c["bucket_tracks"])),
+        ]
+        return (
+            all(len(c[name]) == tracks for name in track_columns)
+            and len(c["artist_name"]) == artists
+            and len(c["track_artist_offsets"]) == tracks + 1
+            and len(c["artist_genre_offsets"]) == artists + 1
+            and len(c["bucket_offsets"]) == genres + 1
+            and all(len(c[name]) and c[name][0] == 0 and c[name][-1] == end for name, end in offset_tables)
+        )
+
+    def string(self, index):
+        offsets = self.columns["string_offsets"]
+        return str(self.string_data[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def optional_string(self, index):
+        return self.string(index) if index else None
+
+    # Rebuilds a Spotify-shaped saved track for one index
+    def track(self, index):
+        c = self.columns
+        artists = [
+            {"id": self.string(c["artist_id"][a]), "name": self.string(c["artist_name"][a])}
+            for a in c["track_artists"][c["track_artist_offsets"][index]:c["track_artist_offsets"][index + 1]]
+        ]
+        image_url = self.optional_string(c["track_image"][index])
+        return {"track": {
+            "id": self.optional_string(c["track_id"][index]),
+            "uri": self.string(c["track_uri"][index]),
+            "name": self.string(c["track_name"][index]),
+            "duration_ms": c["track_duration"][index],
+            "artists": artists,
+            "album": {
+                "id": self.optional_string(c["track_album_id"][index]),
+                "images": [{"url": image_url}] if image_url else [],
+            },
+            "external_ids": {"isrc": self.optional_string(c["track_isrc"][index])},
+            "preview_url": self.optional_string(c["track_preview"][index]),
+        }}
+
+    # Genre buckets as lazy lists of tracks (same shape as liked_songs_genre's output)
+    def genre_buckets(self):
+        c = self.columns
+        buckets = {}
+        for i, name_index in enumerate(c["genre_names"]):
+            indices = c["bucket_tracks"][c["bucket_offsets"][i]:c["bucket_offsets"][i + 1]]
+            buckets[self.string(name_index)] = SnapshotTrackList(self, indices)
+        return buckets
+
+    # Unmaps the file (genre bucket lists from this snapshot must be dropped first)
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        self.string_data.release()
+        self.view.release()
+        self.mm.close()
+
+# Sequence of tracks backed by a slice of track indices in a snapshot
+class SnapshotTrackList(Sequence):
+    def __init__(self, snapshot, indices):
+        self.snapshot = snapshot
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.snapshot.track(index) for index in self.indices[i]]
+        return self.snapshot.track(self.indices[i])
+
+# Opens a snapshot if one exists
+# Input: path
+# Output: LibrarySnapshot (None if missing or unreadable)
+def load_snapshot(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        return LibrarySnapshot(path)
+    except (OSError, ValueError, TypeError, struct.error) as e:
+        print(f"Ignoring library snapshot: {e}")
+        return None
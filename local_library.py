@@ -0,0 +1,176 @@
+# Chase Vitale
+# SwipeBeats
+
+# Local music library backend: indexes audio files on disk so tracks can play without YouTube
+
+# Import statements
+import os
+import re
+import json
+import threading
+
+# Tag reading is optional; only needed when a local library is configured
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+#######################################################################################
+
+# Initializations
+
+AUDIO_EXTENSIONS = {".flac", ".mp3", ".m4a", ".ogg", ".opus", ".wav", ".aac"}
+INDEX_VERSION = 1
+DURATION_TOLERANCE = 5  # Seconds a file may differ from the Spotify duration and still match
+
+# In-memory lookup tables built from the index
+library_files = {}  # path -> tag entry
+isrc_index = {}  # ISRC -> path
+title_index = {}  # (artist, title) -> list of (duration, path)
+library_lock = threading.Lock()
+library_loaded = False
+
+#######################################################################################
+
+# Main functions
+
+# Lowercases a tag and strips punctuation, "feat." credits and version notes so tags match Spotify names
+# Input: string
+# Output: normalized string
+def normalize_tag(text):
+    text = (text or "").lower()
+    text = re.sub(r"[\(\[][^\)\]]*(feat|remaster|version|edit)[^\)\]]*[\)\]]", " ", text)
+    text = re.sub(r"\s-\s.*(remaster|version|edit|mono|stereo).*$", " ", text)
+    text = re.sub(r"\s(feat|ft)\.?\s.*$", " ", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+# Reads the tags we match on from an audio file
+# Input: path to the file, its modification time
+# Output: dictionary of artist, title, duration, isrc and mtime (None if the file has no usable tags)
+def read_tags(path, mtime):
+    audio = mutagen.File(path, easy=True)
+    if audio is None:
+        return None
+    tags = audio.tags or {}
+    artist = (tags.get("artist") or [""])[0]
+    title = (tags.get("title") or [""])[0]
+    if not artist or not title:
+        return None
+    isrc = (tags.get("isrc") or [""])[0]
+    return {
+        "mtime": mtime,
+        "artist": normalize_tag(artist),
+        "title": normalize_tag(title),
+        "duration": round(getattr(audio.info, "length", 0) or 0),
+        "isrc": isrc.upper().replace("-", ""),
+    }
+
+# Loads a saved index from disk
+# Input: path to the index file
+# Output: dictionary of path to tag entry (empty if missing or outdated)
+def load_index(index_path):
+    try:
+        with open(index_path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != INDEX_VERSION:
+        return {}
+    return data.get("files", {})
+
+# Writes the index to disk atomically so a crash never leaves a half-written file
+# Input: path to the index file, dictionary of path to tag entry
+# Output: none
+def save_index(index_path, files):
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": INDEX_VERSION, "files": files}, f)
+    os.replace(tmp_path, index_path)
+
+# Walks the library folders and only re-reads tags for files that are new or changed since the last scan
+# Input: list of folders, dictionary of path to tag entry from the previous scan
+# Output: updated dictionary of path to tag entry, whether anything changed
+def scan_directories(directories, previous_files):
+    files = {}
+    changed = False
+    for directory in directories:
+        for folder, _, names in os.walk(directory):
+            for name in names:
+                if os.path.splitext(name)[1].lower() not in AUDIO_EXTENSIONS:
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                previous = previous_files.get(path)
+                if previous and previous.get("mtime") == mtime:
+                    files[path] = previous
+                    continue
+                try:
+                    entry = read_tags(path, mtime)
+                except Exception as e:
+                    print(f"Error reading tags for {path}: {e}")
+                    entry = None
+                # Untagged files are remembered too so they aren't re-read every scan
+                files[path] = entry or {"mtime": mtime}
+                changed = True
+    if set(files) != set(previous_files):
+        changed = True
+    return files, changed
+
+# Rebuilds the ISRC and (artist, title) lookup tables from the index
+# Input: dictionary of path to tag entry
+# Output: none (updates the module lookup tables)
+def build_lookup_tables(files):
+    global library_files, isrc_index, title_index
+    isrcs = {}
+    titles = {}
+    for path, entry in files.items():
+        if "title" not in entry:
+            continue
+        if entry.get("isrc"):
+            isrcs[entry["isrc"]] = path
+        titles.setdefault((entry["artist"], entry["title"]), []).append((entry["duration"], path))
+    library_files, isrc_index, title_index = files, isrcs, titles
+
+# Scans the library once (incrementally against the saved index) and builds the lookup tables
+# Input: list of folders, path to the index file
+# Output: number of indexed tracks
+def load_library(directories, index_path):
+    global library_loaded
+    with library_lock:
+        if library_loaded:
+            return len(library_files)
+        if mutagen is None:
+            print("Local library disabled: mutagen is not installed (pip install mutagen)")
+            library_loaded = True
+            return 0
+        previous_files = load_index(index_path)
+        files, changed = scan_directories(directories, previous_files)
+        if changed:
+            save_index(index_path, files)
+        build_lookup_tables(files)
+        library_loaded = True
+        print(f"Local library: {len(isrc_index)} tracks with ISRC, {len(title_index)} artist/title pairs")
+        return len(library_files)
+
+# Finds the local file for a Spotify track by ISRC, then by artist, title and duration
+# Input: track
+# Output: path to the file (None if the track isn't in the library)
+def find_local_track(track):
+    t = track["track"]
+    isrc = (t.get("external_ids") or {}).get("isrc")
+    if isrc:
+        path = isrc_index.get(isrc.upper().replace("-", ""))
+        if path:
+            return path
+
+    title = normalize_tag(t["name"])
+    duration = (t.get("duration_ms") or 0) / 1000
+    for artist in t["artists"]:
+        for file_duration, path in title_index.get((normalize_tag(artist["name"]), title), []):
+            if not duration or not file_duration or abs(file_duration - duration) <= DURATION_TOLERANCE:
+                return path
+    return None
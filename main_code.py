@@ -10,7 +10,16 @@ import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 import vlc
 import yt_dlp
+import local_library
+import http_pool
+from profiling import profiled
 import time
+import re
+import random
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
 
 #######################################################################################
 
@@ -19,18 +28,28 @@ import time
 # Set up Spotify client with OAuth for user-level permissions
 load_dotenv()
 
+# All Spotify traffic shares the keep-alive pool in http_pool
 sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
     client_id=os.getenv("SPOTIPY_CLIENT_ID"),
     client_secret=os.getenv("SPOTIPY_CLIENT_SECRET"),
     redirect_uri=os.getenv("SPOTIPY_REDIRECT_URI"),
     scope="user-library-read playlist-modify-private playlist-modify-public",
-    cache_path=None
-))
+    cache_path=None,
+    requests_session=http_pool.session,
+    requests_timeout=http_pool.SPOTIFY_TIMEOUT
+), requests_session=http_pool.session, requests_timeout=http_pool.SPOTIFY_TIMEOUT)
 
 # Set up genre classification json
 with open('genres.json', 'r') as f:
     GENRE_CATEGORIES = json.load(f)
 
+# Main genres that songs are sorted into (anything else is dropped)
+GENRE_BUCKETS = [
+    "country", "hip-hop", "rap", "jazz", "blues", "rock", "soul", "classical",
+    "folk", "funk", "electronic", "latin", "r&b", "reggae", "traditional",
+    "pop", "indie", "theatre", "dance", "unknown"
+]
+
 # Create VLC instance with plugin path
 instance = vlc.Instance()
 
@@ -50,6 +69,40 @@ ydl_opts = {
 }
 ydl = yt_dlp.YoutubeDL(ydl_opts)
 
+SEARCH_CANDIDATES = 5  # How many search results to compare against the Spotify track
+MAX_UNKNOWN_DURATION = 15 * 60  # Seconds; longer videos are likely mixes when the track length is unknown
+RECORDING_DURATION_TOLERANCE_MS = 2000  # Copies of a recording without an ISRC match when this close in length
+recording_durations = {}  # (title, primary artist) -> list of (duration in ms, recording key) seen without an ISRC
+recording_lock = threading.Lock()
+STREAM_PROBE_TIMEOUT = (3, 5)  # (connect, read) seconds for a stream health check
+STREAM_PROBE_BYTES = 1024  # Bytes requested by a stream health check
+
+ARTIST_LOOKUP_WORKERS = 4  # Artist batches looked up at the same time while tracks are still paging
+
+# Local library folders (separated like PATH) and where their index is saved
+LIBRARY_DIRS = [d for d in os.getenv("SWIPEBEATS_LIBRARY_DIRS", "").split(os.pathsep) if d]
+LIBRARY_INDEX_PATH = os.getenv("SWIPEBEATS_LIBRARY_INDEX", "library_index.json")
+
+# Where the library snapshot is kept so the next start can skip the full fetch
+LIBRARY_SNAPSHOT_PATH = os.getenv("SWIPEBEATS_SNAPSHOT", "library_snapshot.bin")
+
+# Playlist that "add to my SwipeBeats playlist" appends to, and where its contents are cached
+TARGET_PLAYLIST_NAME = os.getenv("SWIPEBEATS_TARGET_PLAYLIST", "SwipeBeats Selection")
+PLAYLIST_CACHE_PATH = os.getenv("SWIPEBEATS_PLAYLIST_CACHE", "playlist_cache.json")
+
+# Offline mode never touches the network resolver (local library only)
+OFFLINE_MODE = os.getenv("SWIPEBEATS_OFFLINE") == "1"
+
+# "preview" plays Spotify's 30 second clip when a track has one and only looks up the full song if needed;
+# "full" always plays the full song
+PLAYBACK_MODE = os.getenv("SWIPEBEATS_PLAYBACK_MODE", "full")
+
+# Words that usually mean the video is a different version of the song
+UNWANTED_VERSION_WORDS = [
+    "live", "remix", "cover", "karaoke", "instrumental", "mix", "full album",
+    "hour", "hours", "sped up", "slowed", "nightcore", "reverb", "8d", "reaction"
+]
+
 #######################################################################################
 
 # Main functions
@@ -57,33 +110,42 @@ ydl = yt_dlp.YoutubeDL(ydl_opts)
 # Fetches all of the user's liked tracks.
 # Input: sp (defined)
 # Output: List of tracks
+@profiled("get_all_liked_tracks")
 def get_all_liked_tracks(sp):
 
+    # Parses through the user's liked songs and saves them to a list
+    tracks = []
+    pbar = None
+    for items, total_liked_tracks in iter_liked_track_pages(sp):
+
+        # Initializes a progress bar for parsing liked songs
+        if pbar is None:
+            pbar = tqdm(total=(total_liked_tracks), desc="Fetching liked tracks")
+        tracks.extend(items)
+        pbar.update(len(items))
+
+    # Closes the progress bar and returns the liked songs
+    if pbar:
+        pbar.close()
+    return tracks
+
+# Yields the user's liked tracks one page at a time so callers can work on them as they arrive
+# Input: sp (defined), page size (max 50)
+# Output: generator of (list of tracks in the page, total liked tracks)
+def iter_liked_track_pages(sp, limit=50):
+
     # Calculates how many liked songs the user has in total
     results = sp.current_user_saved_tracks(limit=1)
     total_liked_tracks = results['total']
 
-    # Initializes a progress bar for parsing liked songs
-    pbar = tqdm(total=(total_liked_tracks), desc="Fetching liked tracks")
-
-    # Parses through the user's liked songs and saves them to a list
-    tracks = []
     offset = 0
-    limit = 50
-
-    #while offset < 1:
     while offset < total_liked_tracks:
         response = sp.current_user_saved_tracks(limit=limit, offset=offset, market=None)
         items = response['items']
         if not items:
             break
-        tracks.extend(items)
         offset += len(items)
-        pbar.update(len(items))
-
-    # Closes the progress bar and returns the liked songs
-    pbar.close()
-    return tracks
+        yield items, total_liked_tracks
 
 # Takes a subgenre and returns the main genre using the genres.json file
 # Input: string of subgenre
@@ -131,6 +193,7 @@ def get_artist_ids_from_tracks(tracks):
 # Creates a dictionary with the artist and their genres (converted to main genre)
 # Input: sp (prefefined); list of artist ids
 # Output: a dictionary of artist and genres
+@profiled("get_artist_genres")
 def get_artist_genres(sp, artist_ids):
     genres_by_artist = {}
 
@@ -140,78 +203,401 @@ def get_artist_genres(sp, artist_ids):
     # Fetch artists in batches of 50
     for i in range(0, len(artist_ids), 50):
         batch = artist_ids[i:i+50]
-        response = sp.artists(batch)
+        genres_by_artist.update(get_artist_genres_batch(sp, batch))
+        pbar.update(len(batch))
+    
+    pbar.close()
+    return genres_by_artist
 
-        # Iterates through the responses one at a time
-        for artist in response["artists"]:
+# Looks up one batch of artists and converts their subgenres to main genres
+# Input: sp (predefined); list of at most 50 artist ids
+# Output: a dictionary of artist and genres for the batch
+@profiled("get_artist_genres_batch")
+def get_artist_genres_batch(sp, batch):
+    genres_by_artist = {}
+    response = sp.artists(batch)
 
-            # Converts subgenres to main genres
-            main_genres = []
+    # Iterates through the responses one at a time
+    for artist in response["artists"]:
+        if not artist:
+            continue
 
-            for genre in artist["genres"]:
-                main_genres.append(subgenre_to_genre(genre))
+        # Converts subgenres to main genres
+        main_genres = []
 
-            # Creates the dictionary
-            genres_by_artist[artist["id"]] = {
-                'name': artist["name"],
-                'genres': main_genres
-            }
-        pbar.update(len(batch))
-    
-    pbar.close()
+        for genre in artist["genres"]:
+            main_genres.append(subgenre_to_genre(genre))
+
+        # Creates the dictionary (raw subgenres are kept for swipe analytics)
+        genres_by_artist[artist["id"]] = {
+            'name': artist["name"],
+            'genres': main_genres,
+            'subgenres': artist["genres"]
+        }
     return genres_by_artist
 
+# Creates an empty dictionary of genre buckets
+# Input: none
+# Output: dictionary of genre to empty list
+def empty_genre_buckets():
+    return {genre: [] for genre in GENRE_BUCKETS}
+
+# Adds a track to every genre bucket its artists belong to
+# Input: track; dictionary of artists and genres; dictionary of genre buckets
+# Output: none (updates songs_genres)
+def add_track_to_genres(track, genres_by_artist, songs_genres):
+    artist_ids = [artist["id"] for artist in track["track"]["artists"]]
+    added_genres = set()
+
+    for artist_id in artist_ids:
+        if artist_id in genres_by_artist:
+            for genre in genres_by_artist[artist_id]["genres"]:
+                if genre in songs_genres and genre not in added_genres:
+                    songs_genres[genre].append(track)
+                    added_genres.add(genre)
+
 # Creates a dictionary with liked songs and their genre
 # Input: list of tracks; dictionary of artists and genres
 # Output: dictionary 
+@profiled("liked_songs_genre")
 def liked_songs_genre(tracks, genres_by_artist):
-    songs_genres = {
-        "country": [], 
-        "hip-hop": [],
-        "rap": [],
-        "jazz": [],
-        "blues": [],
-        "rock": [],
-        "soul": [],
-        "classical": [],
-        "folk": [],
-        "funk": [],
-        "electronic": [],
-        "latin": [],
-        "r&b": [],
-        "reggae": [],
-        "traditional": [],
-        "pop": [],
-        "indie": [],
-        "theatre": [],
-        "dance": [],
-        "unknown": []
-    }
+    songs_genres = empty_genre_buckets()
 
     # Initializes a progress bar for parsing artist genres
     pbar = tqdm(total=(len(tracks)), desc="Sorting songs by genre")
 
     for track in tracks:
-        artist_ids = [artist["id"] for artist in track["track"]["artists"]]
-        added_genres = set()
-
-        for artist_id in artist_ids:
-            if artist_id in genres_by_artist:
-                for genre in genres_by_artist[artist_id]["genres"]:
-                    if genre in songs_genres and genre not in added_genres:
-                        songs_genres[genre].append(track)
-                        added_genres.add(genre)
+        add_track_to_genres(track, genres_by_artist, songs_genres)
         pbar.update(1)
 
     pbar.close()
     return songs_genres
 
+# Loads the library in one overlapped pass: pages stream in on one thread, newly seen artists are
+# looked up in 50-id batches as soon as a batch fills, and each track is sorted the moment its artists resolve
+# Input: sp (predefined); callback taking (songs_genres, tracks loaded, total tracks);
+#        optional dictionary of already known artist genres (shared between users in service mode)
+# Output: list of tracks, dictionary of artists and genres, dictionary of genre buckets
+@profiled("load_liked_songs_progressively")
+def load_liked_songs_progressively(sp, on_update=None, genres_by_artist=None):
+    tracks = []
+    if genres_by_artist is None:
+        genres_by_artist = {}
+    songs_genres = empty_genre_buckets()
+
+    # Every stage reports back through one queue so only this thread touches the buckets
+    events = queue.Queue()
+    waiting = {}  # artist id -> tracks (as [track, unresolved artist count]) waiting on it
+    requested = set()
+    pending_batch = []
+    in_flight = 0
+    pages_done = False
+    total_liked_tracks = 0
+
+    def _fetch_pages():
+        try:
+            for items, total in iter_liked_track_pages(sp):
+                events.put(("page", items, total))
+            events.put(("pages_done", None, None))
+        except Exception as e:
+            events.put(("error", e, None))
+
+    def _fetch_artists(batch):
+        try:
+            events.put(("artists", get_artist_genres_batch(sp, batch), batch))
+        except Exception as e:
+            events.put(("error", e, None))
+
+    executor = ThreadPoolExecutor(max_workers=ARTIST_LOOKUP_WORKERS)
+    threading.Thread(target=_fetch_pages, daemon=True).start()
+
+    try:
+        while not pages_done or in_flight:
+            kind, payload, extra = events.get()
+            if kind == "error":
+                raise payload
+
+            if kind == "page":
+                total_liked_tracks = extra
+                tracks.extend(payload)
+                for track in payload:
+                    missing_ids = {
+                        artist["id"] for artist in track["track"]["artists"]
+                        if artist["id"] and artist["id"] not in genres_by_artist
+                    }
+                    if not missing_ids:
+                        add_track_to_genres(track, genres_by_artist, songs_genres)
+                        continue
+                    entry = [track, len(missing_ids)]
+                    for artist_id in missing_ids:
+                        waiting.setdefault(artist_id, []).append(entry)
+                        if artist_id not in requested:
+                            requested.add(artist_id)
+                            pending_batch.append(artist_id)
+
+                    # Sends a lookup as soon as a full batch of new artists is ready
+                    if len(pending_batch) >= 50:
+                        executor.submit(_fetch_artists, pending_batch[:50])
+                        pending_batch = pending_batch[50:]
+                        in_flight += 1
+
+            elif kind == "pages_done":
+                pages_done = True
+                for i in range(0, len(pending_batch), 50):
+                    executor.submit(_fetch_artists, pending_batch[i:i+50])
+                    in_flight += 1
+                pending_batch = []
+
+            elif kind == "artists":
+                in_flight -= 1
+                genres_by_artist.update(payload)
+                for artist_id in extra:
+                    for entry in waiting.pop(artist_id, []):
+                        entry[1] -= 1
+                        if entry[1] == 0:
+                            add_track_to_genres(entry[0], genres_by_artist, songs_genres)
+
+            # Reports partial results so the UI can show them right away
+            if on_update and kind != "pages_done":
+                on_update(songs_genres, len(tracks), total_liked_tracks)
+    finally:
+        executor.shutdown(wait=False)
+
+    return tracks, genres_by_artist, songs_genres
+
+# Gets the key that identifies a recording across its single, album and deluxe releases
+# (the ISRC when Spotify has one, otherwise normalized title and primary artist plus the duration of the
+# first copy seen within RECORDING_DURATION_TOLERANCE_MS, so every copy maps to the same key)
+# Input: track
+# Output: string key
+def recording_key(track):
+    t = track["track"]
+    isrc = (t.get("external_ids") or {}).get("isrc")
+    if isrc:
+        return f"isrc:{isrc.upper()}"
+    artists = t.get("artists") or []
+    title_artist = (normalize_text(t.get("name")), normalize_text(artists[0]["name"]) if artists else "")
+    duration_ms = t.get("duration_ms") or 0
+    with recording_lock:
+        known = recording_durations.setdefault(title_artist, [])
+        for known_duration, key in known:
+            if abs(known_duration - duration_ms) <= RECORDING_DURATION_TOLERANCE_MS:
+                return key
+        key = f"meta:{title_artist[0]}|{title_artist[1]}|{duration_ms}"
+        known.append((duration_ms, key))
+        return key
+
+# Combines tracks from selected genres into a single shuffled deck without repeats
+# Input: list of selected genres, dictionary of song genres, shuffle (False keeps bucket order, genre by genre)
+# Output: combined list of tracks, list of genres that weren't found
+def combine_genre_tracks(selected_genres, song_genres, shuffle=True):
+    combined = []
+    missing_genres = []
+    seen_recordings = set()
+    for genre in selected_genres:
+        if genre in song_genres:
+            for track in song_genres[genre]:
+                # Single, album and deluxe copies of a song only show up once
+                key = recording_key(track)
+                if key not in seen_recordings:
+                    combined.append(track)
+                    seen_recordings.add(key)
+        else:
+            missing_genres.append(genre)
+    if shuffle:
+        random.shuffle(combined)
+    return combined, missing_genres
+
+# Lowercases a title and strips punctuation so titles can be compared
+# Input: string
+# Output: normalized string
+def normalize_text(text):
+    text = re.sub(r"[^\w\s]", " ", (text or "").lower())
+    return " ".join(text.split())
+
+# Calculates how much of one string's words appear in another
+# Input: string to look for, string to look in (both normalized)
+# Output: float between 0 and 1
+def word_overlap(needle, haystack):
+    words = needle.split()
+    if not words:
+        return 0.0
+    haystack_words = set(haystack.split())
+    return sum(1 for word in words if word in haystack_words) / len(words)
+
+# Scores how likely a search result is to be the Spotify track
+# Input: flat search entry, track name, artist names, Spotify duration in ms (or None)
+# Output: float score (higher is better)
+def score_stream_candidate(candidate, track_name, artist_names, duration_ms):
+    title = normalize_text(candidate.get("title"))
+    uploader = normalize_text(candidate.get("channel") or candidate.get("uploader"))
+    name = normalize_text(track_name)
+    artists = normalize_text(artist_names)
+
+    # Title and artist similarity
+    name_score = max(SequenceMatcher(None, name, title).ratio(), word_overlap(name, title))
+    artist_score = word_overlap(artists, f"{title} {uploader}")
+
+    # Closeness to the Spotify duration
+    duration = candidate.get("duration")
+    duration_score = 0.0
+    if duration and duration_ms:
+        difference = abs(duration - duration_ms / 1000)
+        duration_score = max(0.0, 1 - difference / 30)
+    elif duration and duration > MAX_UNKNOWN_DURATION:
+        duration_score = -1.0
+
+    # Penalizes live versions, mixes, covers, etc. unless the track itself is one
+    penalty = 0.0
+    for word in UNWANTED_VERSION_WORDS:
+        if re.search(rf"\b{word}\b", title) and not re.search(rf"\b{word}\b", name):
+            penalty += 0.5
+
+    return 2 * duration_score + name_score + artist_score - penalty
+
+# Searches YouTube for a query without extracting formats
+# (process=False returns the flat search entries, and reusing ydl keeps one yt-dlp connection pool for both phases)
+# Input: string for search, number of results
+# Output: list of flat search entries
+def search_stream_candidates(query, count=SEARCH_CANDIDATES):
+    result = ydl.extract_info(f"ytsearch{count}:{query}", download=False, process=False)
+    if not result:
+        return []
+    return [entry for entry in result.get("entries") or [] if entry]
+
+# Ranks the search results for a query from best to worst match
+# Input: string for search, track name, artist names, Spotify duration in ms (all optional but the query)
+# Output: list of flat search entries
+@profiled("rank_stream_candidates")
+def rank_stream_candidates(query, track_name=None, artist_names=None, duration_ms=None):
+    candidates = search_stream_candidates(query)
+    return sorted(
+        candidates,
+        key=lambda c: score_stream_candidate(c, track_name or query, artist_names or "", duration_ms),
+        reverse=True
+    )
+
+# Fully extracts one video and returns its audio stream
+# Input: flat search entry
+# Output: string of URL (None if extraction failed)
+@profiled("extract_stream_url")
+def extract_stream_url(candidate):
+    video_url = candidate.get("url") or f"https://www.youtube.com/watch?v={candidate['id']}"
+    info = ydl.extract_info(video_url, download=False)
+    if not info:
+        return None
+    return info.get("url")
+
+# Yields the audio stream of each search result, best match first
+# Later candidates are only extracted if the earlier ones are asked past, so they cost nothing until needed
+# Input: string for search, optional track name, artist names and Spotify duration in ms
+# Output: generator of URL strings
+def iter_stream_urls(query, track_name=None, artist_names=None, duration_ms=None):
+
+    # Phase one: cheap flat search, ranked by duration and title/artist similarity
+    for candidate in rank_stream_candidates(query, track_name, artist_names, duration_ms):
+
+        # Phase two: only the video being tried gets full format extraction
+        stream_url = extract_stream_url(candidate)
+        if stream_url:
+            yield stream_url
+
 # Get the URL of the YouTube video that matches the query
-# Input: string for search
+# Input: string for search, optional track name, artist names and Spotify duration in ms
 # Output: string of URL
-def get_stream_url(query):
-    result = ydl.extract_info(f"ytsearch1:{query}", download=False)
-    return result['entries'][0]['url']
+@profiled("get_stream_url")
+def get_stream_url(query, track_name=None, artist_names=None, duration_ms=None):
+    for stream_url in iter_stream_urls(query, track_name, artist_names, duration_ms):
+        return stream_url
+    raise LookupError(f"No playable stream found for '{query}'")
+
+# Builds the YouTube search query for a track
+# Input: track
+# Output: string for search, track name, artist names
+def track_search_query(track):
+    track_name = track["track"]["name"]
+    artist_names = ", ".join(artist["name"] for artist in track["track"]["artists"])
+    return f"{track_name} {artist_names}", track_name, artist_names
+
+# Yields the YouTube streams for a track, using its Spotify metadata to rank the videos
+# Input: track
+# Output: generator of URL strings
+def youtube_stream_source(track):
+    search_query, track_name, artist_names = track_search_query(track)
+    duration_ms = track["track"].get("duration_ms")
+    return iter_stream_urls(search_query, track_name, artist_names, duration_ms)
+
+# Scans the local library folders (once) so local tracks can be matched
+# Input: none
+# Output: number of indexed files
+def load_local_library():
+    if not LIBRARY_DIRS:
+        return 0
+    return local_library.load_library(LIBRARY_DIRS, LIBRARY_INDEX_PATH)
+
+# Finds a track in the local library
+# Input: track
+# Output: list with the path to the file (empty on a miss)
+def local_stream_source(track):
+    if not LIBRARY_DIRS:
+        return []
+    load_local_library()
+    path = local_library.find_local_track(track)
+    return [path] if path else []
+
+# Stream sources tried in order; each takes a track and returns its playable URLs or file paths, best first
+# (an iterable, or a single string / None for simple sources)
+STREAM_SOURCES = [local_stream_source] + ([] if OFFLINE_MODE else [youtube_stream_source])
+
+# Adds a stream source, ahead of the others if first is True
+# Input: source function, first (boolean)
+# Output: none
+def register_stream_source(source, first=False):
+    if first:
+        STREAM_SOURCES.insert(0, source)
+    else:
+        STREAM_SOURCES.append(source)
+
+# Yields every playable URL or file path for a track, best source and best match first
+# Nothing past the first result is looked up until it is asked for, so the rest act as lazy backups
+# Input: track
+# Output: generator of URL or path strings
+def iter_track_streams(track):
+    for source in STREAM_SOURCES:
+        results = source(track)
+        if isinstance(results, str):
+            results = [results]
+        for stream_url in results or []:
+            if stream_url:
+                yield stream_url
+
+# Get a playable URL or file path for a track from the first stream source that has it
+# Input: track
+# Output: string of URL or path
+def get_track_stream_url(track):
+    for stream_url in iter_track_streams(track):
+        return stream_url
+    raise LookupError(f"No stream source has '{track['track']['name']}'")
+
+# Checks that a stream actually serves audio by asking for its first bytes
+# (a small Range GET, since some stream hosts reject HEAD requests)
+# Input: URL or file path
+# Output: boolean
+def probe_stream(stream_url):
+    if not stream_url.startswith(("http://", "https://")):
+        return os.path.exists(stream_url)
+    try:
+        response = http_pool.get(
+            stream_url, timeout=STREAM_PROBE_TIMEOUT, stream=True,
+            headers={"Range": f"bytes=0-{STREAM_PROBE_BYTES - 1}"}
+        )
+    except Exception as e:
+        print(f"Stream probe failed: {e}")
+        return False
+    try:
+        return response.status_code in (200, 206)
+    finally:
+        response.close()
 
 # Creates a list of song names, artists, and stream urls based on the given tracks
 # Input: list of tracks
@@ -221,10 +607,8 @@ def get_all_track_info(tracks):
     for track in tracks:
         track_info = []
         track_uri = track["track"]["uri"]
-        track_name = track["track"]["name"]
-        artist_names = "".join(artist["name"] for artist in track["track"]["artists"])
-        search_query = f"{track_name}, {artist_names}"
-        track_url = get_stream_url(search_query)
+        _, track_name, artist_names = track_search_query(track)
+        track_url = get_track_stream_url(track)
         track_image = track["track"]["album"]["images"][0]["url"]
         track_info = [track_uri, track_name, artist_names, track_url, track_image]
         songs.append(track_info)
@@ -243,14 +627,19 @@ def play_stream_url(stream_url):
     player.play()
     return player
 
+# Gets a track's Spotify preview clip if the playback mode allows it
+# Input: track, playback mode ("preview" or "full")
+# Output: string of URL (None when the full song should be played)
+def get_preview_url(track, mode=PLAYBACK_MODE):
+    if mode != "preview":
+        return None
+    return track["track"].get("preview_url")
+
 # Locates and plays the audio for a specific track object
-# Input: track
+# Input: track, playback mode ("preview" or "full")
 # Output: none/audio
-def play_stream_track(track):
-    track_name = track["track"]["name"]
-    artist_names = ", ".join(artist["name"] for artist in track["track"]["artists"])
-    search_query = f"{track_name} {artist_names}"
-    stream_url = get_stream_url(search_query)
+def play_stream_track(track, mode=PLAYBACK_MODE):
+    stream_url = get_preview_url(track, mode) or get_track_stream_url(track)
     play_stream_url(stream_url)
 
 # Creates a new playlist with given name
@@ -265,10 +654,106 @@ def create_playlist(sp, name, description):
 # Input: sp, playlist id, and track uris
 # Output: none
 def add_to_playlist(sp, playlist_id, track_uris):
+    snapshot_id = None
     # Spotify API allows adding max 100 tracks per request
     for i in range(0, len(track_uris), 100):
         batch = track_uris[i:i+100]
-        sp.playlist_add_items(playlist_id, batch)
+        snapshot_id = sp.playlist_add_items(playlist_id, batch)["snapshot_id"]
+    return snapshot_id
+
+# Finds a playlist the user owns by name
+# Input: sp, playlist name
+# Output: playlist dictionary (None if the user has no playlist with that name)
+def find_playlist_by_name(sp, name):
+    # The listing includes playlists the user only follows, which can't be added to
+    user_id = sp.current_user()["id"]
+    offset = 0
+    while True:
+        response = sp.current_user_playlists(limit=50, offset=offset)
+        for playlist in response["items"]:
+            if playlist and playlist["name"] == name and playlist["owner"]["id"] == user_id:
+                return playlist
+        if not response["next"]:
+            return None
+        offset += len(response["items"])
+
+# Loads the saved playlist contents cache
+# Input: none
+# Output: dictionary of playlist id to {"snapshot_id", "uris"}
+def load_playlist_cache():
+    try:
+        with open(PLAYLIST_CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Saves the playlist contents cache atomically
+# Input: dictionary of playlist id to {"snapshot_id", "uris"}
+# Output: none
+def save_playlist_cache(cache):
+    tmp_path = f"{PLAYLIST_CACHE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, PLAYLIST_CACHE_PATH)
+
+# Gets every track URI in a playlist, reading Spotify only when the playlist changed since the cached copy
+# Input: sp, playlist id, the playlist's current snapshot id, playlist cache dictionary,
+#        optional function called before each page request (e.g. a rate limiter's wait)
+# Output: set of track uris
+def get_playlist_track_uris(sp, playlist_id, snapshot_id, cache, before_request=None):
+    cached = cache.get(playlist_id)
+    if cached and cached["snapshot_id"] == snapshot_id:
+        return set(cached["uris"])
+
+    uris = set()
+    offset = 0
+    while True:
+        if before_request:
+            before_request()
+        response = sp.playlist_items(
+            playlist_id, fields="items(track(uri)),next", limit=100, offset=offset, additional_types=("track",)
+        )
+        for item in response["items"]:
+            if item.get("track") and item["track"].get("uri"):
+                uris.add(item["track"]["uri"])
+        if not response["next"]:
+            break
+        offset += len(response["items"])
+
+    cache[playlist_id] = {"snapshot_id": snapshot_id, "uris": sorted(uris)}
+    return uris
+
+# Adds only the tracks that aren't already in the playlist
+# Input: sp, playlist id, track uris, the playlist's snapshot id if already known (e.g. from the listing)
+# Output: number of tracks added, number already in the playlist
+def add_new_tracks_to_playlist(sp, playlist_id, track_uris, snapshot_id=None):
+    cache = load_playlist_cache()
+    if snapshot_id is None:
+        snapshot_id = sp.playlist(playlist_id, fields="snapshot_id")["snapshot_id"]
+    existing_uris = get_playlist_track_uris(sp, playlist_id, snapshot_id, cache)
+
+    # Set difference, keeping swipe order (and dropping repeats within this session)
+    new_uris = [uri for uri in dict.fromkeys(track_uris) if uri not in existing_uris]
+    if new_uris:
+        snapshot_id = add_to_playlist(sp, playlist_id, new_uris)
+
+    # Our own additions are folded into the cache so the next session doesn't re-read the playlist
+    cache[playlist_id] = {"snapshot_id": snapshot_id, "uris": sorted(existing_uris.union(new_uris))}
+    save_playlist_cache(cache)
+    return len(new_uris), len(track_uris) - len(new_uris)
+
+# Adds tracks to the user's SwipeBeats playlist, creating it the first time
+# Input: sp, track uris, playlist name
+# Output: playlist id, number of tracks added, number already in the playlist
+def append_to_target_playlist(sp, track_uris, name=None):
+    name = name or TARGET_PLAYLIST_NAME
+    playlist = find_playlist_by_name(sp, name)
+    if playlist:
+        playlist_id, snapshot_id = playlist["id"], playlist.get("snapshot_id")
+    else:
+        playlist_id, snapshot_id = create_playlist(sp, name, "Songs you liked in SwipeBeats"), None
+    added, skipped = add_new_tracks_to_playlist(sp, playlist_id, track_uris, snapshot_id)
+    return playlist_id, added, skipped
 
 # Prints all subgenres found in liked songs
 # Input: sp (Spotify client), tracks (list of liked tracks)
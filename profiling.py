@@ -0,0 +1,152 @@
+# Chase Vitale
+# SwipeBeats
+
+# Opt-in profiling: run with SWIPEBEATS_PROFILE=1 (or --profile) to get per-stage CPU profiles,
+# allocation stats and a summary written when the app exits
+
+# Import statements
+import os
+import sys
+import time
+import atexit
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from functools import wraps
+
+#######################################################################################
+
+# Initializations
+
+PROFILING_ENABLED = os.getenv("SWIPEBEATS_PROFILE") == "1" or "--profile" in sys.argv
+PROFILE_DIR = os.getenv("SWIPEBEATS_PROFILE_DIR", "profiles")
+TOP_N = 15  # Functions and allocation sites listed in the summary
+
+stage_profiles = {}  # (stage, thread id) -> cProfile.Profile (a profiler can't be shared between threads)
+stage_stats = {}  # stage -> dictionary of calls, wall time and process-wide allocation change
+stats_lock = threading.Lock()
+thread_state = threading.local()  # .profiling is True while a stage's profiler runs on this thread
+
+# Before Python 3.12 each thread has its own profiler hook, so stages on different threads profile in
+# parallel. From 3.12 cProfile runs on sys.monitoring, which is process-wide: only one stage in the whole
+# process can hold a CPU profile at a time (the rest record timing only), and that profile also picks up
+# calls other threads make while it runs
+PER_THREAD_PROFILER = sys.version_info < (3, 12)
+process_profiler_active = False  # Python 3.12+: some stage in the process holds the profiler
+
+#######################################################################################
+
+# Main functions
+
+# Claims the CPU profiler for a stage (per thread before Python 3.12, per process from 3.12)
+# A stage nested in another one, or concurrent with one on 3.12+, doesn't get it and only records timing
+# Input: none
+# Output: True if the caller may enable its profiler
+def claim_profiler():
+    global process_profiler_active
+    if PER_THREAD_PROFILER:
+        if getattr(thread_state, "profiling", False):
+            return False
+        thread_state.profiling = True
+        return True
+    with stats_lock:
+        if process_profiler_active:
+            return False
+        process_profiler_active = True
+        return True
+
+# Gives the CPU profiler back after a stage finishes
+# Input: none
+# Output: none
+def release_profiler():
+    global process_profiler_active
+    if PER_THREAD_PROFILER:
+        thread_state.profiling = False
+    else:
+        with stats_lock:
+            process_profiler_active = False
+
+# Wraps a function so its CPU time, wall time and allocations are recorded under a stage name
+# When profiling is off the function is returned untouched, so there is no overhead at all
+# The allocation figure is the change in process-wide traced memory while the stage ran, so it includes
+# whatever other threads allocated meanwhile (tracemalloc can't attribute memory to threads)
+# Input: stage name
+# Output: decorator
+def profiled(stage):
+    def decorator(func):
+        if not PROFILING_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stats_lock:
+                profile = stage_profiles.setdefault((stage, threading.get_ident()), cProfile.Profile())
+
+            # Enabling a second profiler would silently replace the first (before 3.12) or fail (3.12+)
+            profiling_cpu = claim_profiler()
+            if profiling_cpu:
+                try:
+                    profile.enable()
+                except ValueError:  # A profiler from outside this module is active (Python 3.12+)
+                    release_profiler()
+                    profiling_cpu = False
+
+            memory_before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if profiling_cpu:
+                    profile.disable()
+                    release_profiler()
+                allocated = tracemalloc.get_traced_memory()[0] - memory_before
+                with stats_lock:
+                    stats = stage_stats.setdefault(stage, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0})
+                    stats["calls"] += 1
+                    stats["seconds"] += elapsed
+                    stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+                    stats["bytes"] += allocated
+        return wrapper
+    return decorator
+
+# Writes a .prof dump per stage, the top allocation sites and a readable summary
+# Input: none
+# Output: none (files in PROFILE_DIR)
+def write_profile_report():
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    summary_path = os.path.join(PROFILE_DIR, "summary.txt")
+    with stats_lock, open(summary_path, "w") as summary:
+        summary.write(f"{'stage':<32}{'calls':>8}{'total s':>12}{'mean ms':>12}{'max ms':>12}{'process alloc KB':>18}\n")
+        for stage, stats in sorted(stage_stats.items(), key=lambda x: x[1]["seconds"], reverse=True):
+            summary.write(
+                f"{stage:<32}{stats['calls']:>8}{stats['seconds']:>12.3f}"
+                f"{1000 * stats['seconds'] / stats['calls']:>12.1f}{1000 * stats['max_seconds']:>12.1f}"
+                f"{stats['bytes'] / 1024:>18.1f}\n"
+            )
+
+        # Merges each stage's per-thread profiles into one dump
+        merged = {}
+        for (stage, _), profile in stage_profiles.items():
+            try:
+                if stage in merged:
+                    merged[stage].add(profile)
+                else:
+                    merged[stage] = pstats.Stats(profile, stream=summary)
+            except TypeError:
+                pass  # Profiler never collected anything
+        for stage, stats in merged.items():
+            stats.dump_stats(os.path.join(PROFILE_DIR, f"{stage}.prof"))
+            summary.write(f"\n=== {stage}: top {TOP_N} by cumulative time ===\n")
+            stats.sort_stats("cumulative").print_stats(TOP_N)
+
+        if tracemalloc.is_tracing():
+            summary.write(f"\n=== top {TOP_N} allocation sites still held at exit ===\n")
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:TOP_N]:
+                summary.write(f"{stat}\n")
+    print(f"Profile written to {summary_path}")
+
+if PROFILING_ENABLED:
+    tracemalloc.start()
+    atexit.register(write_profile_report)
@@ -0,0 +1,456 @@
+# Chase Vitale
+# SwipeBeats
+
+# Service mode: runs the SwipeBeats pipeline over HTTP so a whole team can swipe at once
+# Usage: python service_code.py --host 0.0.0.0 --port 8080
+
+# Import statements
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import spotipy
+import http_pool
+import main_code as mc  # Shared Spotify + resolver backend logic
+
+#######################################################################################
+
+# Initializations
+
+SESSION_TTL = 60 * 60  # Seconds a session may sit idle before it is dropped
+STREAM_URL_TTL = 5 * 60 * 60  # YouTube stream URLs expire after roughly six hours
+STREAM_CACHE_MAX_ENTRIES = 50000
+ART_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MAX_BODY_BYTES = 64 * 1024
+WORKER_THREADS = int(os.getenv("SWIPEBEATS_SERVICE_WORKERS", "32"))  # Threads for blocking spotipy/yt-dlp calls
+# Library loads block a thread for the whole load, so they get their own pool and never starve request calls
+LIBRARY_LOAD_THREADS = int(os.getenv("SWIPEBEATS_LIBRARY_LOAD_WORKERS", "4"))
+
+#######################################################################################
+
+# Helper classes
+
+# Raised by request handlers to send an error status back to the client
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# Cache shared by every session; concurrent loads of the same key only run once
+class SharedCache:
+    def __init__(self, ttl=None, max_bytes=None, sizeof=None, max_entries=None):
+        self.entries = OrderedDict()  # key -> (value, expiry time or None, size in bytes)
+        self.pending = {}  # key -> future for a load in progress
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    # Returns the cached value, or awaits the loader once for everyone asking for this key
+    async def get(self, key, loader):
+        entry = self.entries.get(key)
+        if entry and (entry[1] is None or entry[1] > time.monotonic()):
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+        if key in self.pending:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self.pending[key])
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()  # Waiters must not hang on a load that will never finish
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Marks it retrieved when nobody else was waiting
+            raise
+        finally:
+            self.pending.pop(key, None)
+        future.set_result(value)
+        self.put(key, value)
+        return value
+
+    # Stores a value and evicts the least recently used entries over the byte or entry budget
+    def put(self, key, value):
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)[2]
+        size = self.sizeof(value) if self.sizeof else 0
+        expiry = time.monotonic() + self.ttl if self.ttl else None
+        self.entries[key] = (value, expiry, size)
+        self.total_bytes += size
+        while len(self.entries) > 1 and (
+            (self.max_bytes and self.total_bytes > self.max_bytes)
+            or (self.max_entries and len(self.entries) > self.max_entries)
+        ):
+            _, (_, _, old_size) = self.entries.popitem(last=False)
+            self.total_bytes -= old_size
+            self.stats["evictions"] += 1
+
+    # Drops entries whose TTL has passed
+    def expire(self):
+        now = time.monotonic()
+        for key in [k for k, (_, expiry, _) in self.entries.items() if expiry is not None and expiry <= now]:
+            self.total_bytes -= self.entries.pop(key)[2]
+            self.stats["evictions"] += 1
+
+    def get_stats(self):
+        return dict(self.stats, entries=len(self.entries), bytes=self.total_bytes)
+
+#######################################################################################
+
+# Main functions
+
+# Downloads an album cover
+# Input: string of the image URL
+# Output: bytes of the image
+def fetch_art_bytes(url):
+    response = http_pool.get(url, timeout=http_pool.ART_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+# Builds a Spotify client for one user's access token (never shared between sessions)
+# Input: string of the OAuth access token
+# Output: spotipy client
+def spotify_for_token(access_token):
+    return spotipy.Spotify(
+        auth=access_token, requests_session=http_pool.session, requests_timeout=http_pool.SPOTIFY_TIMEOUT
+    )
+
+# Turns a track into the JSON card sent to the client
+# Input: track, deck index, deck size, stream URL
+# Output: dictionary
+def track_card(track, index, total, stream_url):
+    t = track["track"]
+    images = t["album"].get("images", [])
+    return {
+        "index": index,
+        "total": total,
+        "id": t["id"],
+        "uri": t["uri"],
+        "name": t["name"],
+        "artists": ", ".join(artist["name"] for artist in t["artists"]),
+        "art_url": images[0]["url"] if images else None,
+        "stream_url": stream_url,
+    }
+
+# Runs the library, deck, swipe and playlist pipeline for many users with shared caches
+class SwipeService:
+    def __init__(
+        self, spotify_factory=spotify_for_token, resolver=None, art_fetcher=fetch_art_bytes, executor=None,
+        library_executor=None
+    ):
+        self.spotify_factory = spotify_factory
+        self.resolver = resolver or mc.get_track_stream_url
+        self.art_fetcher = art_fetcher
+        self.executor = executor or ThreadPoolExecutor(max_workers=WORKER_THREADS)
+        self.library_executor = library_executor or ThreadPoolExecutor(
+            max_workers=LIBRARY_LOAD_THREADS, thread_name_prefix="library-load"
+        )
+        self.sessions = {}
+        self.background_tasks = set()  # Keeps prefetch tasks alive until they finish
+
+        # Shared across every user
+        self.artist_genres = {}
+        self.stream_cache = SharedCache(ttl=STREAM_URL_TTL, max_entries=STREAM_CACHE_MAX_ENTRIES)
+        self.art_cache = SharedCache(max_bytes=ART_CACHE_MAX_BYTES, sizeof=len)
+
+    # Runs a blocking spotipy/yt-dlp/requests call off the event loop
+    async def run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    # Runs a whole library load on the library pool (extra loads queue there instead of holding request threads)
+    async def run_library_load(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.library_executor, func, *args)
+
+    # Looks up a session and marks it as active
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ServiceError(404, "Unknown session")
+        session["last_seen"] = time.monotonic()
+        return session
+
+    # Drops sessions that have been idle for longer than SESSION_TTL
+    def expire_sessions(self):
+        cutoff = time.monotonic() - SESSION_TTL
+        for session_id in [sid for sid, s in self.sessions.items() if s["last_seen"] < cutoff]:
+            self.close_session(session_id)
+
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session and session["load_task"]:
+            session["load_task"].cancel()
+
+    def create_session(self, access_token):
+        if not access_token:
+            raise ServiceError(400, "access_token is required")
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = {
+            "sp": self.spotify_factory(access_token),
+            "last_seen": time.monotonic(),
+            "load_task": None,
+            "song_genres": mc.empty_genre_buckets(),
+            "genre_counts": {},
+            "loaded": 0,
+            "total": None,
+            "done": False,
+            "error": None,
+            "deck": [],
+            "index": 0,
+            "right_swipes": [],
+        }
+        return session_id
+
+    # Loads a user's library in a worker thread, publishing counts as each page is sorted
+    async def load_library(self, session):
+        loop = asyncio.get_running_loop()
+
+        def _on_update(songs_genres, loaded, total):
+            counts = {genre: len(tracks) for genre, tracks in songs_genres.items()}
+            def _apply():
+                session["song_genres"] = songs_genres
+                session["genre_counts"] = counts
+                session["loaded"] = loaded
+                session["total"] = total
+            loop.call_soon_threadsafe(_apply)
+
+        try:
+            _, _, song_genres = await self.run_library_load(
+                mc.load_liked_songs_progressively, session["sp"], _on_update, self.artist_genres
+            )
+            session["song_genres"] = song_genres
+            session["genre_counts"] = {genre: len(tracks) for genre, tracks in song_genres.items()}
+            session["done"] = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            session["error"] = str(e)
+
+    def start_library_load(self, session):
+        if session["load_task"] is None:
+            session["load_task"] = asyncio.create_task(self.load_library(session))
+        return self.library_status(session)
+
+    def library_status(self, session):
+        return {
+            "genres": session["genre_counts"],
+            "loaded": session["loaded"],
+            "total": session["total"],
+            "done": session["done"],
+            "error": session["error"],
+        }
+
+    def build_deck(self, session, genres):
+        if not isinstance(genres, list) or not genres:
+            raise ServiceError(400, "genres must be a non-empty list")
+        deck, missing_genres = mc.combine_genre_tracks(genres, session["song_genres"])
+        session["deck"] = deck
+        session["index"] = 0
+        session["right_swipes"] = []
+        if deck:
+            self.prefetch_stream(deck[0])
+        return {"size": len(deck), "missing": missing_genres}
+
+    # Resolves a recording's stream once for all users (duplicate copies of a song share it)
+    async def stream_for(self, track):
+        return await self.stream_cache.get(
+            mc.recording_key(track), lambda: self.run_blocking(self.resolver, track)
+        )
+
+    # Starts resolving a track in the background so it is ready when the user swipes to it
+    def prefetch_stream(self, track):
+        async def _prefetch():
+            try:
+                await self.stream_for(track)
+            except Exception as e:
+                print(f"Error prefetching stream: {e}")
+        task = asyncio.create_task(_prefetch())
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def current_card(self, session):
+        deck, index = session["deck"], session["index"]
+        if index >= len(deck):
+            return {"done": True, "liked": len(session["right_swipes"])}
+        track = deck[index]
+        if index + 1 < len(deck):
+            self.prefetch_stream(deck[index + 1])
+        try:
+            stream_url = await self.stream_for(track)
+        except Exception as e:
+            print(f"Error resolving stream: {e}")
+            stream_url = None
+        return track_card(track, index, len(deck), stream_url)
+
+    async def swipe(self, session, direction):
+        if direction not in ("left", "right"):
+            raise ServiceError(400, "direction must be 'left' or 'right'")
+        if session["index"] < len(session["deck"]):
+            if direction == "right":
+                session["right_swipes"].append(session["deck"][session["index"]])
+            session["index"] += 1
+        return await self.current_card(session)
+
+    async def art(self, session):
+        deck, index = session["deck"], session["index"]
+        if index >= len(deck):
+            raise ServiceError(404, "No current card")
+        images = deck[index]["track"]["album"].get("images", [])
+        if not images:
+            raise ServiceError(404, "Track has no album art")
+        url = images[0]["url"]
+        return await self.art_cache.get(url, lambda: self.run_blocking(self.art_fetcher, url))
+
+    async def create_playlist(self, session, name):
+        right_swipes = session["right_swipes"]
+        if not right_swipes:
+            raise ServiceError(400, "No right swipes yet")
+        name = name or f"SwipeBeats Selection - {len(right_swipes)} songs"
+        track_uris = [track["track"]["uri"] for track in right_swipes]
+        playlist_id = await self.run_blocking(
+            mc.create_playlist, session["sp"], name, "Songs you liked in SwipeBeats"
+        )
+        await self.run_blocking(mc.add_to_playlist, session["sp"], playlist_id, track_uris)
+        return {"playlist_id": playlist_id, "added": len(track_uris)}
+
+    def get_stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "artists": len(self.artist_genres),
+            "streams": self.stream_cache.get_stats(),
+            "art": self.art_cache.get_stats(),
+            "http": http_pool.get_connection_stats(),
+        }
+
+    # Routes one request to its handler
+    # Input: HTTP method, URL path, parsed JSON body
+    # Output: (status code, dictionary or bytes)
+    async def dispatch(self, method, path, body):
+        parts = [part for part in path.split("/") if part]
+        if parts == ["stats"] and method == "GET":
+            return 200, self.get_stats()
+        if parts == ["sessions"] and method == "POST":
+            return 201, {"session_id": self.create_session(body.get("access_token"))}
+        if len(parts) < 2 or parts[0] != "sessions":
+            raise ServiceError(404, "Not found")
+
+        session = self.get_session(parts[1])
+        action = parts[2] if len(parts) > 2 else None
+        if action is None and method == "DELETE":
+            self.close_session(parts[1])
+            return 200, {"closed": True}
+        if action == "library" and method == "POST":
+            return 202, self.start_library_load(session)
+        if action == "genres" and method == "GET":
+            return 200, self.library_status(session)
+        if action == "deck" and method == "POST":
+            return 200, self.build_deck(session, body.get("genres"))
+        if action == "card" and method == "GET":
+            return 200, await self.current_card(session)
+        if action == "swipe" and method == "POST":
+            return 200, await self.swipe(session, body.get("direction"))
+        if action == "art" and method == "GET":
+            return 200, await self.art(session)
+        if action == "playlist" and method == "POST":
+            return 200, await self.create_playlist(session, body.get("name"))
+        raise ServiceError(404, "Not found")
+
+    # Handles one request and turns errors into JSON responses
+    # Input: HTTP method, URL path, raw body bytes
+    # Output: (status code, response bytes, content type)
+    async def handle_request(self, method, path, raw_body):
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise ServiceError(400, "Body must be a JSON object")
+            status, payload = await self.dispatch(method, path, body)
+        except ServiceError as e:
+            status, payload = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, payload = 400, {"error": f"Invalid JSON: {e}"}
+        except Exception as e:
+            print(f"Error handling {method} {path}: {e}")
+            status, payload = 500, {"error": str(e)}
+        if isinstance(payload, bytes):
+            return status, payload, "image/jpeg"
+        return status, json.dumps(payload).encode(), "application/json"
+
+    # Serves HTTP/1.1 requests (with keep-alive) on one connection
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    status, payload, content_type = 413, b'{"error": "Body too large"}', "application/json"
+                    keep_alive = False
+                else:
+                    raw_body = await reader.readexactly(length) if length else b""
+                    status, payload, content_type = await self.handle_request(method, urlsplit(target).path, raw_body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # Periodically drops idle sessions and expired stream URLs
+    async def expire_sessions_forever(self):
+        while True:
+            await asyncio.sleep(60)
+            self.expire_sessions()
+            self.stream_cache.expire()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        expiry_task = asyncio.create_task(self.expire_sessions_forever())
+        print(f"SwipeBeats service listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry_task.cancel()
+
+#######################################################################################
+
+# Entry point
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run SwipeBeats as a multi-user HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--profile", action="store_true", help="Write per-stage profiles on exit")
+    args = parser.parse_args()
+    asyncio.run(SwipeService().serve(args.host, args.port))